@@ -2,123 +2,188 @@ import asyncio
 import websockets
 import json
 import logging
-from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+import functools
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+try:
+    import orjson
+    _loads = orjson.loads  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+except ImportError:
+    _loads = json.loads
+
+from relay_protocol import FARM_QUEUE_SIZE, batch_frame
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
 logger = logging.getLogger("CentralServer")
 
-# Store connected clients and their info
-farm_devices: Dict[str, object] = {}  # Store device_id -> websocket object
-farm_device_info: Dict[str, Dict] = {}  # Store device_id -> device info
+# Store connected clients and their info (farm devices live in the DeviceRegistry created by main)
 master_device_websocket: Optional[object] = None # Store the master's websocket object
 master_device_id: Optional[str] = None # Store the master's device ID
 master_device_info: Optional[Dict] = None # Store the master's full device info
 
-async def broadcast_to_farm_devices(message):
-    """Send a message to all connected farm devices"""
-    if farm_devices:
-        disconnected_ids = []
-        successful_broadcasts = 0
-        
-        # Parse the message to get action type for logging
-        try:
-            data = json.loads(message)
-            action_type = data.get('action', 'unknown')
-        except json.JSONDecodeError:
-            action_type = "unknown"
-            
-        # Broadcast to all farm devices
-        for device_id, websocket in list(farm_devices.items()): # Iterate over a copy
-            logger.debug(f"Attempting to send message to farm device: {device_id}")
+MAX_CONCURRENT_SENDS = 100 # Cap on farm device sends in flight at once across all writers
+MAX_BATCH_SIZE = 32 # Most queued actions merged into a single "batch" frame
+
+async def _farm_writer(device_id: str, websocket, queue: asyncio.Queue, send_sem: asyncio.Semaphore):
+    """Drain a farm device's outbound queue onto its websocket"""
+    # One long-lived task per farm device awaits send() directly; no Task is created
+    # per message. A peer that stops reading just backs up its queue (see the drop
+    # policy in DeviceRegistry.broadcast) until websockets' keepalive closes it.
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < MAX_BATCH_SIZE:
             try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        if len(batch) == 1:
+            message = batch[0]
+        else:
+            # Actions that piled up while the last send was draining go out as one frame
+            message = batch_frame(batch)
+        try:
+            async with send_sem:
                 await websocket.send(message)
-                successful_broadcasts += 1
-                logger.debug(f"Sent {action_type} to farm device: {device_id}")
-                
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_ids.append(device_id)
-                logger.warning(f"Connection closed while sending to farm device: {device_id}")
-            except Exception as e:
-                disconnected_ids.append(device_id)
-                logger.error(f"Error sending to farm device {device_id}: {e}")
-        
-        # Remove disconnected devices
-        for device_id in disconnected_ids:
-            if device_id in farm_devices:
-                del farm_devices[device_id]
-                if device_id in farm_device_info:
-                    del farm_device_info[device_id]
-                logger.info(f"Removed disconnected farm device: {device_id}")
+            logger.debug("Sent %s message(s) to farm device: %s", len(batch), device_id)
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning("Connection closed while sending to farm device: %s", device_id)
+            return
+        except Exception as e:
+            logger.error("Error sending to farm device %s: %s", device_id, e)
+
+@dataclass
+class DeviceEntry:
+    """A connected farm device: its socket, reported info and outbound writer"""
+    websocket: object
+    info: Dict
+    queue: asyncio.Queue
+    writer: asyncio.Task
+
+class DeviceRegistry:
+    """Connected farm devices keyed by device ID, one entry per device"""
+
+    def __init__(self):
+        self._devices: Dict[str, DeviceEntry] = {}
+        # Built here rather than at import so it binds to the running loop (Python 3.9)
+        self._send_sem = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+    def __len__(self) -> int:
+        return len(self._devices)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._devices
+
+    def register(self, device_id: str, websocket, info: Dict) -> DeviceEntry:
+        """Add a farm device (or refresh its info), starting its writer on first registration"""
+        entry = self._devices.get(device_id)
+        if entry is not None and entry.websocket is websocket:
+            entry.info = info
+            return entry
+        if entry is not None:
+            # Same device ID reconnected on a new socket; the old writer has nothing left to do
+            entry.writer.cancel()
+        queue = asyncio.Queue(maxsize=FARM_QUEUE_SIZE)
+        writer = asyncio.create_task(_farm_writer(device_id, websocket, queue, self._send_sem))
+        entry = DeviceEntry(websocket, info, queue, writer)
+        self._devices[device_id] = entry
+        return entry
+
+    def unregister(self, device_id: str, websocket=None) -> Optional[DeviceEntry]:
+        """Remove a farm device and stop its writer (only if still owned by websocket, when given)"""
+        entry = self._devices.get(device_id)
+        if entry is None or (websocket is not None and entry.websocket is not websocket):
+            return None
+        del self._devices[device_id]
+        entry.writer.cancel()
+        return entry
+
+    def broadcast(self, payload: bytes) -> int:
+        """Queue payload for every farm device, returning how many had to drop a stale action"""
+        dropped = 0
+        # A device that can't keep up loses its oldest pending action instead of
+        # stalling the master or growing without bound
+        for device_id, entry in self._devices.items():
+            if entry.queue.full():
+                entry.queue.get_nowait()
+                dropped += 1
+                logger.debug("Farm device %s is backed up, dropped its oldest pending action", device_id)
+            entry.queue.put_nowait(payload)
+        return dropped
+
+async def broadcast_to_farm_devices(registry: DeviceRegistry, message: str, action_type: str = "unknown"):
+    """Queue a message for all connected farm devices (action_type comes from the caller's parse)"""
+    if registry:
+        # Encode once here rather than once per device inside send(); every queue shares this buffer
+        payload = message.encode('utf-8') if isinstance(message, str) else message
+        dropped = registry.broadcast(payload)
                 
         # Log broadcast summary
-        if successful_broadcasts > 0:
-            logger.info(f"Successfully broadcasted {action_type} to {successful_broadcasts} farm device(s)")
+        if dropped:
+            logger.warning("Broadcasted %s to %s farm device(s), %s backed up and dropped a stale action", action_type, len(registry), dropped)
         else:
-            logger.warning(f"Failed to broadcast {action_type} to any farm devices (0/{len(farm_devices)} connected)")
+            logger.debug("Successfully broadcasted %s to %s farm device(s)", action_type, len(registry))
             
     else:
         logger.warning("No farm devices connected. Action not replicated.")
 
-async def handle_master_device(websocket):
+async def handle_master_device(registry: DeviceRegistry, websocket):
     """Handle messages from the master device"""
     global master_device_websocket, master_device_id, master_device_info
     master_device_websocket = websocket
     client_address = websocket.remote_address if hasattr(websocket, 'remote_address') else 'Unknown'
-    logger.info(f"Master device connected: {client_address}")
+    logger.info("Master device connected: %s", client_address)
     print(f"🎮 MASTER DEVICE CONNECTED: {client_address}")
     
     try:
         async for message in websocket:
             try:
                 # Parse the message
-                data = json.loads(message)
+                data = _loads(message)
+                action_type = data.get('action', 'unknown')
                 
-                # Handle device info message
-                if data.get('action') == 'device_info' and data.get('role') == 'master':
+                # Handle device info message (role is only looked up for device_info frames)
+                if action_type == 'device_info' and data.get('role') == 'master':
                     master_device_info = data.get('device_info')
                     master_device_id = master_device_info.get('id', 'Unknown')
                     device_model = master_device_info.get('model', 'Unknown')
                     device_version = master_device_info.get('android_version', 'Unknown')
-                    logger.info(f"Master device info: {device_model} (Android {device_version}, ID: {master_device_id})")
+                    logger.info("Master device info: %s (Android %s, ID: %s)", device_model, device_version, master_device_id)
                     
                     # If this master device was somehow added as a farm device, remove it
-                    if master_device_id in farm_devices:
-                        del farm_devices[master_device_id]
-                        if master_device_id in farm_device_info:
-                            del farm_device_info[master_device_id]
-                        logger.warning(f"Master device {master_device_id} was incorrectly in farm_devices, removed.")
+                    if registry.unregister(master_device_id) is not None:
+                        logger.warning("Master device %s was incorrectly registered as a farm device, removed.", master_device_id)
                     continue  # Don't broadcast device info messages
                 
-                logger.info(f"Received action from master: {data}")
-                
-                # Print action to console for visibility
-                action_type = data.get('action', 'unknown')
-                if 'x' in data and 'y' in data:
-                    print(f"🎯 ACTION RECEIVED: {action_type} at ({data['x']}, {data['y']})")
-                else:
-                    print(f"🎯 ACTION RECEIVED: {action_type}")
+                # The broadcast summary is logged by broadcast_to_farm_devices; no per-message
+                # prints here so the receive loop never blocks on stdout
+                logger.debug("Received action from master: %s", data)
                 
                 # Broadcast the action to all farm devices
-                await broadcast_to_farm_devices(message)
-                print(f"📡 BROADCASTED to {len(farm_devices)} farm device(s)")
+                await broadcast_to_farm_devices(registry, message, action_type)
             except json.JSONDecodeError:
-                logger.error(f"Received invalid JSON from master: {message}")
+                logger.error("Received invalid JSON from master: %s", message)
             except Exception as e:
-                logger.error(f"Error processing message from master: {e}")
+                logger.error("Error processing message from master: %s", e)
     except websockets.exceptions.ConnectionClosed:
-        logger.info(f"Master device disconnected: {client_address}")
+        logger.info("Master device disconnected: %s", client_address)
     except Exception as e:
-        logger.error(f"Unexpected error with master device: {e}")
+        logger.error("Unexpected error with master device: %s", e)
     finally:
         master_device_websocket = None
         master_device_id = None
         master_device_info = None
 
-async def handle_farm_device(websocket):
+async def handle_farm_device(registry: DeviceRegistry, websocket):
     """Handle connection from a farm device"""
     client_address = websocket.remote_address if hasattr(websocket, 'remote_address') else 'Unknown'
-    logger.info(f"Farm device connected: {client_address}")
+    logger.info("Farm device connected: %s", client_address)
     print(f"🤖 FARM DEVICE CONNECTED: {client_address}")
     
     current_farm_device_id: Optional[str] = None
@@ -127,7 +192,7 @@ async def handle_farm_device(websocket):
         # Keep the connection open and handle any messages
         async for message in websocket:
             try:
-                data = json.loads(message)
+                data = _loads(message)
                 
                 # Handle device info message
                 if data.get('action') == 'device_info' and data.get('role') == 'farm':
@@ -135,38 +200,38 @@ async def handle_farm_device(websocket):
                     device_id = device_info.get('id', 'Unknown')
                     
                     if master_device_id and device_id == master_device_id:
-                        logger.info(f"Farm device {device_id} is actually the master device. Not adding to farm_devices.")
+                        logger.info("Farm device %s is actually the master device. Not registering it as a farm device.", device_id)
                         # Close this connection as it's the master trying to connect as a farm device
                         await websocket.close(1000, "Master device attempting to connect as farm device.")
                         return # Exit handler for this websocket
                     
+                    if current_farm_device_id and current_farm_device_id != device_id:
+                        registry.unregister(current_farm_device_id, websocket)
                     current_farm_device_id = device_id
-                    farm_devices[device_id] = websocket
-                    farm_device_info[device_id] = device_info
+                    registry.register(device_id, websocket, device_info)
                     
                     device_model = device_info.get('model', 'Unknown')
                     device_version = device_info.get('android_version', 'Unknown')
-                    logger.info(f"Farm device info: {device_model} (Android {device_version}, ID: {device_id})")
+                    logger.info("Farm device info: %s (Android %s, ID: %s)", device_model, device_version, device_id)
                 else:
-                    logger.warning(f"Received unexpected message from farm device {current_farm_device_id or client_address}: {data}")
+                    logger.warning("Received unexpected message from farm device %s: %s", current_farm_device_id or client_address, data)
             except json.JSONDecodeError:
-                logger.error(f"Received invalid JSON from farm device {current_farm_device_id or client_address}: {message}")
+                logger.error("Received invalid JSON from farm device %s: %s", current_farm_device_id or client_address, message)
             except Exception as e:
-                logger.error(f"Error processing message from farm device {current_farm_device_id or client_address}: {e}")
+                logger.error("Error processing message from farm device %s: %s", current_farm_device_id or client_address, e)
     except websockets.exceptions.ConnectionClosed:
-        logger.info(f"Farm device disconnected: {current_farm_device_id or client_address}")
+        logger.info("Farm device disconnected: %s", current_farm_device_id or client_address)
     except Exception as e:
-        logger.error(f"Unexpected error with farm device {current_farm_device_id or client_address}: {e}")
+        logger.error("Unexpected error with farm device %s: %s", current_farm_device_id or client_address, e)
     finally:
-        # Remove from the set of farm devices
-        if current_farm_device_id and current_farm_device_id in farm_devices:
-            del farm_devices[current_farm_device_id]
-        if current_farm_device_id and current_farm_device_id in farm_device_info:
-            del farm_device_info[current_farm_device_id]
+        # Remove from the registry unless a newer connection already took over this device ID
+        if current_farm_device_id:
+            registry.unregister(current_farm_device_id, websocket)
 
 async def main():
     server_host = "0.0.0.0"
     server_port = 8765
+    registry = DeviceRegistry()
 
     logger.info(f"Starting Central Server on ws://{server_host}:{server_port}")
     
@@ -188,8 +253,8 @@ async def main():
         
         # Create router with path-based handlers
         router = Router()
-        router.add_route("/master", handle_master_device)
-        router.add_route("/farm", handle_farm_device)
+        router.add_route("/master", functools.partial(handle_master_device, registry))
+        router.add_route("/farm", functools.partial(handle_farm_device, registry))
         
         # Start server with router
         async with serve(router, server_host, server_port):
@@ -214,9 +279,9 @@ async def main():
             logger.info(f"Client connected: {client_address} (Path: {path})")
             
             if path == "/master":
-                await handle_master_device(websocket)
+                await handle_master_device(registry, websocket)
             elif path == "/farm":
-                await handle_farm_device(websocket)
+                await handle_farm_device(registry, websocket)
             else:
                 logger.warning(f"Unknown connection path: {path}")
                 await websocket.close(1008, "Invalid path")
@@ -230,7 +295,10 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if UVLOOP_AVAILABLE:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Server stopped by user (Ctrl+C)")
     except Exception as e:
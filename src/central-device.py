@@ -2,78 +2,145 @@ import asyncio
 import websockets
 import json
 import logging
+import argparse
 from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+from websockets.server import WebSocketServerProtocol
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+try:
+    import orjson
+    _loads = orjson.loads  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    _dumps = orjson.dumps  # Returns bytes, ready to send
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+from relay_protocol import FARM_QUEUE_SIZE, batch_frame
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
 logger = logging.getLogger("CentralServer")
 
 # Store connected clients and their info
-farm_devices: Dict[str, object] = {}  # Store device_id -> websocket object
+farm_devices: Dict[str, WebSocketServerProtocol] = {}  # Store device_id -> websocket object
 farm_device_info: Dict[str, Dict] = {}  # Store device_id -> device info
-master_device_websocket: Optional[object] = None # Store the master's websocket object
+farm_queues: Dict[str, asyncio.Queue] = {}  # Store device_id -> outbound queue drained by that device's pump task
+master_device_websocket: Optional[WebSocketServerProtocol] = None # Store the master's websocket object
 master_device_id: Optional[str] = None # Store the master's device ID
 master_device_info: Optional[Dict] = None # Store the master's full device info
 master_resolution: Optional[Dict[str, int]] = None # Store master device's screen resolution and input capabilities
+master_resolution_frame: Optional[bytes] = None # Encoded master_resolution_update, built once per published resolution
+_broadcast_resolution_key: Optional[Tuple[int, int, int, int]] = None # Resolution every connected farm device already has
+BATCH_WINDOW = 0.008 # Seconds master actions are held so a burst goes out as one "batch" frame
+events_since_last_log: int = 0 # Master actions relayed since periodic_stats last reported
+STATS_INTERVAL: float = 1.0 # Seconds between aggregated relay stats
+verbose: bool = False # Set by --verbose: echo every relayed action to the console
 
-async def broadcast_to_farm_devices(message):
-    """Send a message to all connected farm devices"""
-    if farm_devices:
-        disconnected_ids = []
-        successful_broadcasts = 0
-        
-        # Parse the message to get action type for logging
+# Console formatters for actions that carry more than a single point, built once at import
+_ACTION_FMT: Dict[str, Callable[[Dict], str]] = {
+    'swipe': lambda d: f"👆 ACTION RECEIVED: swipe from ({d.get('start_x', 0)}, {d.get('start_y', 0)}) to ({d.get('end_x', 0)}, {d.get('end_y', 0)}) duration={d.get('duration', 0)}ms",
+    'long_tap': lambda d: f"🔒 ACTION RECEIVED: long_tap at ({d.get('x', 0)}, {d.get('y', 0)}) duration={d.get('duration', 0)}ms",
+}
+
+def format_action(action_type: str, data: Dict) -> str:
+    """Render a master action for the console"""
+    fmt = _ACTION_FMT.get(action_type)
+    if fmt:
+        return fmt(data)
+    if 'x' in data and 'y' in data:
+        return f"🎯 ACTION RECEIVED: {action_type} at ({data['x']}, {data['y']})"
+    return f"🎯 ACTION RECEIVED: {action_type}"
+
+async def _farm_pump(device_id: str, websocket: WebSocketServerProtocol, queue: asyncio.Queue) -> None:
+    """Send queued frames to one farm device, in order, until its connection closes"""
+    while True:
+        payload = await queue.get()
         try:
-            data = json.loads(message)
-            action_type = data.get('action', 'unknown')
-        except json.JSONDecodeError:
-            action_type = "unknown"
+            await websocket.send(payload)
+        except websockets.exceptions.ConnectionClosed:
+            logger.warning(f"Connection closed while sending to farm device: {device_id}")
+            return
+        except Exception as e:
+            logger.error(f"Error sending to farm device {device_id}: {e}")
+
+def unregister_farm_device(device_id: str, websocket: Optional[WebSocketServerProtocol] = None) -> bool:
+    """Forget a farm device (only if websocket still owns its ID, when given)"""
+    if device_id not in farm_devices or (websocket is not None and farm_devices[device_id] is not websocket):
+        return False
+    del farm_devices[device_id]
+    farm_device_info.pop(device_id, None)
+    farm_queues.pop(device_id, None)
+    return True
+
+async def broadcast_batch(payloads: List[bytes], action_types: List[str]) -> None:
+    """Broadcast held master actions, merged into one batch frame when there is more than one"""
+    if len(payloads) == 1:
+        await broadcast_to_farm_devices(payloads[0], action_types[0])
+    else:
+        frame = batch_frame(payloads)
+        # The label is only for logs, so spell out its contents only when debug output is on
+        if logger.isEnabledFor(logging.DEBUG):
+            label = f"batch of {len(payloads)} ({', '.join(action_types)})"
+        else:
+            label = "batch"
+        await broadcast_to_farm_devices(frame, label)
+
+async def broadcast_to_farm_devices(payload: bytes, action_type: str = "unknown") -> None:
+    """Queue an encoded message for all connected farm devices (action_type is only used for logging)"""
+    if farm_queues:
+        dropped_ids = []
             
-        # Broadcast to all farm devices
-        for device_id, websocket in list(farm_devices.items()): # Iterate over a copy
-            logger.debug(f"Attempting to send message to farm device: {device_id}")
-            try:
-                await websocket.send(message)
-                successful_broadcasts += 1
-                logger.debug(f"Sent {action_type} to farm device: {device_id}")
-                
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_ids.append(device_id)
-                logger.warning(f"Connection closed while sending to farm device: {device_id}")
-            except Exception as e:
-                disconnected_ids.append(device_id)
-                logger.error(f"Error sending to farm device {device_id}: {e}")
-        
-        # Remove disconnected devices
-        for device_id in disconnected_ids:
-            if device_id in farm_devices:
-                del farm_devices[device_id]
-                if device_id in farm_device_info:
-                    del farm_device_info[device_id]
-                logger.info(f"Removed disconnected farm device: {device_id}")
+        # Never awaits: each device's pump sends at its own pace, so a slow farm
+        # device can't hold up the master's receive loop or the other devices.
+        # One that can't keep up loses its oldest pending frame instead
+        for device_id, queue in farm_queues.items():
+            if queue.full():
+                queue.get_nowait()
+                dropped_ids.append(device_id)
+            queue.put_nowait(payload)
+        if dropped_ids:
+            logger.warning(f"Farm device(s) {dropped_ids} are {FARM_QUEUE_SIZE} frames behind, dropped their oldest pending frame for {action_type}")
                 
-        # Log broadcast summary
-        if successful_broadcasts > 0:
-            logger.info(f"Successfully broadcasted {action_type} to {successful_broadcasts} farm device(s)")
-        else:
-            logger.warning(f"Failed to broadcast {action_type} to any farm devices (0/{len(farm_devices)} connected)")
+        logger.debug("Successfully broadcasted %s to %s farm device(s)", action_type, len(farm_queues))
             
     else:
         logger.warning("No farm devices connected. Action not replicated.")
 
-async def handle_master_device(websocket):
+async def handle_master_device(websocket: WebSocketServerProtocol) -> None:
     """Handle messages from the master device"""
-    global master_device_websocket, master_device_id, master_device_info, master_resolution
+    global master_device_websocket, master_device_id, master_device_info, master_resolution, master_resolution_frame, events_since_last_log
+    global _broadcast_resolution_key
     master_device_websocket = websocket
     client_address = websocket.remote_address if hasattr(websocket, 'remote_address') else 'Unknown'
     logger.info(f"Master device connected: {client_address}")
     print(f"🎮 MASTER DEVICE CONNECTED: {client_address}")
     
+    # Actions received within BATCH_WINDOW of the first pending one are flushed together
+    pending_payloads: List[bytes] = []
+    pending_types: List[str] = []
+    flush_task: Optional[asyncio.Task] = None
+
+    async def flush_pending(delay: float) -> None:
+        nonlocal flush_task
+        await asyncio.sleep(delay)
+        payloads, types = pending_payloads[:], pending_types[:]
+        pending_payloads.clear()
+        pending_types.clear()
+        flush_task = None
+        await broadcast_batch(payloads, types)
+
     try:
         async for message in websocket:
             try:
                 # Parse the message
-                data = json.loads(message)
+                data = _loads(message)
                 
                 # Handle device info message
                 if data.get('action') == 'device_info' and data.get('role') == 'master':
@@ -95,44 +162,39 @@ async def handle_master_device(websocket):
                             "input_x_max": master_input_x_max,
                             "input_y_max": master_input_y_max
                         }
-                        logger.info(f"Master device resolution: {master_width}x{master_height}, Input Max: {master_input_x_max}x{master_input_y_max}")
-                        # Broadcast master resolution and input capabilities to all farm devices
-                        await broadcast_to_farm_devices(json.dumps({
+                        master_resolution_frame = _dumps({
                             "action": "master_resolution_update",
                             "resolution": master_resolution
-                        }))
+                        })
+                        logger.info(f"Master device resolution: {master_width}x{master_height}, Input Max: {master_input_x_max}x{master_input_y_max}")
+                        # Broadcast master resolution and input capabilities to all farm devices,
+                        # unless they all already have this exact one (e.g. the master just reconnected)
+                        resolution_key = (master_width, master_height, master_input_x_max, master_input_y_max)
+                        if resolution_key != _broadcast_resolution_key:
+                            await broadcast_to_farm_devices(master_resolution_frame, "master_resolution_update")
+                            _broadcast_resolution_key = resolution_key
+                        else:
+                            logger.info("Master resolution unchanged, farm devices already have it")
                     
                     logger.info(f"Master device info: {device_model} (Android {device_version}, ID: {master_device_id})")
                     
                     # If this master device was somehow added as a farm device, remove it
-                    if master_device_id in farm_devices:
-                        del farm_devices[master_device_id]
-                        if master_device_id in farm_device_info:
-                            del farm_device_info[master_device_id]
+                    if unregister_farm_device(master_device_id):
                         logger.warning(f"Master device {master_device_id} was incorrectly in farm_devices, removed.")
                     continue  # Don't broadcast device info messages
                 
-                logger.info(f"Received action from master: {data}")
-                
-                # Print action to console for visibility
+                # Per-action output is debug-only (see --verbose); periodic_stats reports totals once a second
                 action_type = data.get('action', 'unknown')
-                if action_type == 'swipe':
-                    start_x, start_y = data.get('start_x', 0), data.get('start_y', 0)
-                    end_x, end_y = data.get('end_x', 0), data.get('end_y', 0)
-                    duration = data.get('duration', 0)
-                    print(f"👆 ACTION RECEIVED: swipe from ({start_x}, {start_y}) to ({end_x}, {end_y}) duration={duration}ms")
-                elif action_type == 'long_tap':
-                    x, y = data.get('x', 0), data.get('y', 0)
-                    duration = data.get('duration', 0)
-                    print(f"🔒 ACTION RECEIVED: long_tap at ({x}, {y}) duration={duration}ms")
-                elif 'x' in data and 'y' in data:
-                    print(f"🎯 ACTION RECEIVED: {action_type} at ({data['x']}, {data['y']})")
-                else:
-                    print(f"🎯 ACTION RECEIVED: {action_type}")
+                logger.debug("Received action from master: %s %s", action_type, data)
+                if verbose:
+                    print(format_action(action_type, data))
+                events_since_last_log += 1
                 
-                # Broadcast the action to all farm devices
-                await broadcast_to_farm_devices(message)
-                print(f"📡 BROADCASTED to {len(farm_devices)} farm device(s)")
+                # Hold the action (encoded once for every send) for the current batch window
+                pending_payloads.append(message.encode('utf-8') if isinstance(message, str) else message)
+                pending_types.append(action_type)
+                if flush_task is None:
+                    flush_task = asyncio.create_task(flush_pending(BATCH_WINDOW))
             except json.JSONDecodeError:
                 logger.error(f"Received invalid JSON from master: {message}")
             except Exception as e:
@@ -142,24 +204,33 @@ async def handle_master_device(websocket):
     except Exception as e:
         logger.error(f"Unexpected error with master device: {e}")
     finally:
+        # Don't lose actions still waiting for their batch window
+        if flush_task is not None:
+            flush_task.cancel()
+        if pending_payloads:
+            await broadcast_batch(pending_payloads, pending_types)
         master_device_websocket = None
         master_device_id = None
         master_device_info = None
         master_resolution = None # Clear master resolution on disconnect
+        master_resolution_frame = None
 
-async def handle_farm_device(websocket):
+async def handle_farm_device(websocket: WebSocketServerProtocol) -> None:
     """Handle connection from a farm device"""
+    global _broadcast_resolution_key
     client_address = websocket.remote_address if hasattr(websocket, 'remote_address') else 'Unknown'
     logger.info(f"Farm device connected: {client_address}")
     print(f"🤖 FARM DEVICE CONNECTED: {client_address}")
     
     current_farm_device_id: Optional[str] = None
+    queue: Optional[asyncio.Queue] = None
+    pump_task: Optional[asyncio.Task] = None
 
     try:
         # Keep the connection open and handle any messages
         async for message in websocket:
             try:
-                data = json.loads(message)
+                data = _loads(message)
                 
                 # Handle device info message
                 if data.get('action') == 'device_info' and data.get('role') == 'farm':
@@ -172,21 +243,30 @@ async def handle_farm_device(websocket):
                         await websocket.close(1000, "Master device attempting to connect as farm device.")
                         return # Exit handler for this websocket
                     
+                    # A connection that re-reports under a new ID must not keep the old one fed too
+                    if current_farm_device_id and current_farm_device_id != device_id:
+                        unregister_farm_device(current_farm_device_id, websocket)
                     current_farm_device_id = device_id
+                    if pump_task is None:
+                        queue = asyncio.Queue(maxsize=FARM_QUEUE_SIZE)
+                        pump_task = asyncio.create_task(_farm_pump(device_id, websocket, queue))
                     farm_devices[device_id] = websocket
                     farm_device_info[device_id] = device_info
+                    farm_queues[device_id] = queue
                     
                     device_model = device_info.get('model', 'Unknown')
                     device_version = device_info.get('android_version', 'Unknown')
                     logger.info(f"Farm device info: {device_model} (Android {device_version}, ID: {device_id})")
                     
                     # If master resolution is known, send it to the newly connected farm device
-                    if master_resolution:
-                        await websocket.send(json.dumps({
-                            "action": "master_resolution_update",
-                            "resolution": master_resolution
-                        }))
-                        logger.info(f"Sent master resolution to new farm device: {device_id}")
+                    if master_resolution_frame is not None:
+                        # The same encoded frame the master's broadcast used, queued so it can't
+                        # overtake actions already queued for this device
+                        queue.put_nowait(master_resolution_frame)
+                        logger.info(f"Queued master resolution for new farm device: {device_id}")
+                    else:
+                        # This device has no resolution yet, so the next master one must be broadcast
+                        _broadcast_resolution_key = None
                 else:
                     logger.warning(f"Received unexpected message from farm device {current_farm_device_id or client_address}: {data}")
             except json.JSONDecodeError:
@@ -198,13 +278,31 @@ async def handle_farm_device(websocket):
     except Exception as e:
         logger.error(f"Unexpected error with farm device {current_farm_device_id or client_address}: {e}")
     finally:
-        # Remove from the set of farm devices
-        if current_farm_device_id and current_farm_device_id in farm_devices:
-            del farm_devices[current_farm_device_id]
-        if current_farm_device_id and current_farm_device_id in farm_device_info:
-            del farm_device_info[current_farm_device_id]
+        if pump_task is not None:
+            pump_task.cancel()
+        # Remove from the set of farm devices unless a newer connection already took over this device ID
+        if current_farm_device_id:
+            unregister_farm_device(current_farm_device_id, websocket)
+
+async def periodic_stats() -> None:
+    """Log how many master actions were relayed since the last report"""
+    global events_since_last_log
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        if events_since_last_log:
+            logger.info(f"Relayed {events_since_last_log} action(s) to {len(farm_queues)} farm device(s) in the last {STATS_INTERVAL:g}s")
+            events_since_last_log = 0
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Central Server - Relays master device actions to farm devices')
+    parser.add_argument('--verbose', action='store_true', help='Print and log every relayed action instead of once-a-second totals')
+    args = parser.parse_args()
+
+    global verbose
+    verbose = args.verbose
+    if verbose:
+        logger.setLevel(logging.DEBUG)
 
-async def main():
     server_host = "0.0.0.0"
     server_port = 8765
 
@@ -222,7 +320,7 @@ async def main():
         logger.error(f"Could not determine local IP address: {e}")
 
     # Use the modern websockets API with path-based routing
-    async def route_handler(websocket):
+    async def route_handler(websocket: WebSocketServerProtocol) -> None:
         """Route connections based on path"""
         # Access path through websocket.request.path (newer websockets library)
         path = getattr(websocket, 'request', None)
@@ -243,16 +341,27 @@ async def main():
             logger.warning(f"Unknown connection path: {path}")
             await websocket.close(1008, "Invalid path")
 
-    # Start the server with path-based routing
-    start_server = websockets.serve(route_handler, server_host, server_port)
+    # Start the server with path-based routing. Action frames are tiny JSON, so
+    # permessage-deflate only costs CPU and latency; a small max_size caps per-frame buffering.
+    start_server = websockets.serve(
+        route_handler, server_host, server_port,
+        compression=None, max_size=2**16, ping_interval=20
+    )
     server = await start_server
+    stats_task = asyncio.create_task(periodic_stats())
     
     # Keep the server running indefinitely
-    await server.wait_closed()
+    try:
+        await server.wait_closed()
+    finally:
+        stats_task.cancel()
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if UVLOOP_AVAILABLE:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Server stopped by user (Ctrl+C)")
     except Exception as e:
@@ -2,11 +2,13 @@ import asyncio
 import websockets
 import json
 import logging
-import subprocess
-import argparse
-import sys
+import os
+import random
+import re
+import shlex
+import threading
 import time
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
@@ -18,6 +20,22 @@ except ImportError:
     UIAUTOMATOR2_AVAILABLE = False
     logging.warning("uiautomator2 not available. Falling back to ADB commands.")
 
+# uvloop is optional; a faster drop-in event loop for the subprocess and websocket traffic (not on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# orjson is optional; it serializes straight to bytes, which websockets sends as-is
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+    _loads = orjson.loads  # orjson.JSONDecodeError subclasses json.JSONDecodeError
+except ImportError:
+    ORJSON_AVAILABLE = False
+    _loads = json.loads
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, 
@@ -29,6 +47,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger("FarmDeviceExecutor")
 
+# Local adb server, used to stream device attach/detach events (host:track-devices)
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = 5037
+
 class DeviceStatus(Enum):
     DISCONNECTED = "disconnected"
     CONNECTING = "connecting"
@@ -47,48 +69,285 @@ class DeviceInfo:
     last_seen: float
     error_count: int = 0
     websocket: Optional[object] = None
+    # Touchscreen input node and ABS_MT_POSITION_X/Y maxima, probed once for --sendevent
+    touch_device: Optional[str] = None
+    touch_max_x: int = 0
+    touch_max_y: int = 0
+    touch_probed: bool = False
+    # Master raw input -> farm pixel factors; None until computed from master_resolution
+    _scale_x: Optional[float] = None
+    _scale_y: Optional[float] = None
+    # Serialized device_info message; the fields it carries never change for a device
+    _info_payload: Optional[bytes] = None
+
+# "<serial> <state> [key:value ...]" rows of 'adb devices -l' whose state is exactly 'device'
+# (the "List of devices attached" header never matches)
+_ADB_DEVICE_RE = re.compile(rb'^(\S+)[ \t]+device\b', re.M)
+
+# One "[key]: [value]" line per property in a bare 'getprop' dump
+_GETPROP_RE = re.compile(r'^\[([^\]]+)\]: \[([^\]]*)\]', re.M)
+
+# 'getevent -p' prints axis codes in hex: 0035 = ABS_MT_POSITION_X, 0036 = ABS_MT_POSITION_Y
+_GETEVENT_DEVICE_RE = re.compile(r'^add device \d+:\s*(\S+)')
+_GETEVENT_AXIS_RE = re.compile(r'\b(0035|0036)\s*:.*?\bmax\s+(\d+)')
+
+def shell_command(*args) -> str:
+    """Build a device shell command line with every argument quoted, so action data can't break the shared shell"""
+    return ' '.join(shlex.quote(str(arg)) for arg in args)
+
+def _read_stdin_line() -> str:
+    """Read one line straight from fd 0, holding no lock on sys.stdin the way input() does"""
+    chunks = []
+    while True:
+        ch = os.read(0, 1)
+        if not ch:
+            if not chunks:
+                raise EOFError
+            break
+        if ch == b'\n':
+            break
+        chunks.append(ch)
+    return b''.join(chunks).decode('utf-8', 'replace')
+
+async def read_line(prompt: str) -> str:
+    """Prompt for a line on a daemon thread, so Ctrl+C at a prompt exits without waiting for Enter"""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _resolve(line: Optional[str], error: Optional[Exception]):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(line)
+
+    def _read():
+        try:
+            line, error = _read_stdin_line(), None
+        except Exception as e:
+            line, error = None, e
+        try:
+            loop.call_soon_threadsafe(_resolve, line, error)
+        except RuntimeError:
+            pass  # Loop already closed (e.g. after Ctrl+C); nobody is waiting for this line
+
+    print(prompt, end='', flush=True)
+    # asyncio.run joins default-executor threads on shutdown, so input() there would hang until Enter
+    threading.Thread(target=_read, daemon=True).start()
+    return await future
+
+# Linux input key names -> Android key event codes for 'input keyevent'
+_KEY_MAPPING = {
+    'KEY_BACK': '4',
+    'KEY_HOME': '3',
+    'KEY_MENU': '82',
+    'KEY_POWER': '26',
+    'KEY_VOLUMEUP': '24',
+    'KEY_VOLUMEDOWN': '25',
+    'BTN_BACK': '4',
+    'KEY_ENTER': '66',
+    'KEY_SPACE': '62',
+}
+
+def parse_touch_device(output: str) -> Optional[Tuple[str, int, int]]:
+    """Return (event path, max x, max y) of the first multi-touch device in 'getevent -p' output"""
+    path = None
+    axes: Dict[str, int] = {}
+    for line in output.splitlines():
+        device_match = _GETEVENT_DEVICE_RE.match(line)
+        if device_match:
+            path = device_match.group(1)
+            axes = {}
+            continue
+        axis_match = _GETEVENT_AXIS_RE.search(line)
+        if path and axis_match:
+            axes[axis_match.group(1)] = int(axis_match.group(2))
+            if '0035' in axes and '0036' in axes:
+                return path, axes['0035'], axes['0036']
+    return None
+
+async def _adb_server_send(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: str):
+    """Send one length-prefixed request to the adb server and check its OKAY/FAIL reply"""
+    data = request.encode('utf-8')
+    writer.write(b"%04x%s" % (len(data), data))
+    await writer.drain()
+    status = await reader.readexactly(4)
+    if status != b"OKAY":
+        length = int(await reader.readexactly(4), 16)
+        message = (await reader.readexactly(length)).decode('utf-8', 'replace')
+        # Not an OSError: the server answered, so falling back to the adb client wouldn't help
+        raise RuntimeError(f"adb server refused {request!r}: {message}")
+
+async def adb_server_query(service: str, transport: Optional[str] = None) -> bytes:
+    """Run one adb service straight over the adb server socket, without spawning an adb client.
+
+    Host services (transport=None) return their length-prefixed reply; device services such
+    as 'shell:<cmd>' switch to the transport serial first and return everything until EOF.
+    """
+    reader, writer = await asyncio.open_connection(ADB_SERVER_HOST, ADB_SERVER_PORT)
+    try:
+        if transport is None:
+            await _adb_server_send(reader, writer, service)
+            length = int(await reader.readexactly(4), 16)
+            return await reader.readexactly(length)
+        await _adb_server_send(reader, writer, f"host:transport:{transport}")
+        await _adb_server_send(reader, writer, service)
+        return await reader.read()
+    finally:
+        writer.close()
+
+class AdbShell:
+    """A long-lived 'adb -s <id> shell' that runs queued commands over its stdin"""
+
+    SENTINEL = "__FARM_RC__"  # Echoed after each command with its exit code
+    FLUSH_WINDOW = 0.005  # Seconds to let a burst of commands pile up before writing them together
+
+    def __init__(self, device_id: str, timeout: float = 15.0):
+        self.device_id = device_id
+        self.timeout = timeout
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        """Spawn the shell process (stdin is a pipe, so adb runs it without a pty)"""
+        self.process = await asyncio.create_subprocess_exec(
+            'adb', '-s', self.device_id, 'shell',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        logger.debug(f"{self.device_id}: Started persistent adb shell (pid {self.process.pid})")
+
+    async def run(self, command: str, capture: bool = False) -> Tuple[int, str]:
+        """Run a shell command, returning its exit code and stderr, or its stdout if capture is set"""
+        # Input commands print nothing useful on success, so by default stdout is dropped on the device
+        # and only stderr comes back for error reports; queries capture stdout and drop stderr instead
+        redirect = "2>/dev/null" if capture else "2>&1 >/dev/null"
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((f"{{ {command}; }} {redirect}", future))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        # Commands queued within FLUSH_WINDOW (or while the previous write was running)
+        # go to the device as one write and are read back in order
+        try:
+            while True:
+                await asyncio.sleep(self.FLUSH_WINDOW)
+                batch, self._pending = self._pending, []
+                if not batch:
+                    return
+                try:
+                    await asyncio.wait_for(self._run_batch(batch), timeout=self.timeout)
+                except BaseException as e:
+                    # Output of the interrupted batch may still arrive; start clean next time
+                    await self._kill()
+                    if isinstance(e, asyncio.TimeoutError):
+                        error = ConnectionError(f"adb shell for {self.device_id} timed out")
+                    elif isinstance(e, Exception):
+                        error = e
+                    else:
+                        error = ConnectionError(f"adb shell for {self.device_id} closed")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+                    if not isinstance(e, Exception):
+                        raise
+        finally:
+            self._flusher = None
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        if not self.alive:
+            await self.start()
+        self.process.stdin.write(''.join(f"{command}; echo {self.SENTINEL}$?\n" for command, _ in batch).encode('utf-8'))
+        await self.process.stdin.drain()
+        for _, future in batch:
+            result = await self._read_result()
+            if not future.done():
+                future.set_result(result)
+
+    async def _read_result(self) -> Tuple[int, str]:
+        output = []
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise ConnectionError(f"adb shell for {self.device_id} exited")
+            text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+            # Output without a trailing newline leaves the sentinel at the end of its last line
+            marker = text.rfind(self.SENTINEL)
+            if marker != -1:
+                if marker:
+                    output.append(text[:marker])
+                return int(text[marker + len(self.SENTINEL):]), '\n'.join(output)
+            output.append(text)
+
+    async def _kill(self):
+        process, self.process = self.process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    async def close(self):
+        """Stop flushing, fail any queued commands and terminate the shell process"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+        pending, self._pending = self._pending, []
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError(f"adb shell for {self.device_id} closed"))
+        await self._kill()
 
 class FarmDeviceManager:
-    def __init__(self, central_server_url: str = "ws://127.0.0.1:8765/farm", debug: bool = False):
+    def __init__(self, central_server_url: str = "ws://127.0.0.1:8765/farm", debug: bool = False, use_sendevent: bool = False):
         self.central_server_url = central_server_url
         self.debug = debug
+        self.use_sendevent = use_sendevent  # Inject taps as raw touch events instead of 'input tap'
         self.devices: Dict[str, DeviceInfo] = {}
         self.master_resolution: Optional[Dict[str, int]] = None
-        self.pending_taps: Dict[str, Dict[str, int]] = {}  # Track tap_press for each device
         self.pending_swipes: Dict[str, Dict[str, int]] = {}  # Track swipe_start for each device
         self.uiautomator2_devices: Dict[str, object] = {}  # Cache uiautomator2 device connections
+        self.shells: Dict[str, AdbShell] = {}  # Persistent adb shell per device for input commands
+        self._prop_cache: Dict[str, Dict[str, str]] = {}  # getprop results; fixed while a device stays attached
         self.max_retry_attempts = 5
         self.retry_delay = 5
+        self._connect_sem = asyncio.Semaphore(4)  # Caps simultaneous connects to the central server
+        self._setup_sem = asyncio.Semaphore(16)  # Caps devices doing post-connect adb setup at once
         self.device_check_interval = 10
         self.connection_timeout = 30
+        self.inbox_size = 64  # Received actions buffered per device before the socket reader waits
         self.master_device: Optional[str] = None # To store the ID of the master device
+        self._connection_tasks: Set[asyncio.Task] = set()  # Connections started for devices attached later
 
     async def discover_devices(self) -> List[str]:
         """Discover all connected Android devices via ADB"""
         try:
             logger.info("🔍 Discovering connected devices...")
-            process = await asyncio.create_subprocess_exec(
-                'adb', 'devices', '-l',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                logger.error(f"ADB devices command failed: {stderr.decode('utf-8')}")
-                return []
-            
-            output = stdout.decode('utf-8').strip()
-            lines = output.split('\n')[1:]  # Skip header
+            try:
+                stdout = await adb_server_query('host:devices-l')
+            except OSError:
+                # No adb server listening yet; the adb client starts one
+                process = await asyncio.create_subprocess_exec(
+                    'adb', 'devices', '-l',
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                stdout, stderr = await process.communicate()
+                
+                if process.returncode != 0:
+                    logger.error(f"ADB devices command failed: {stderr.decode('utf-8')}")
+                    return []
             
-            devices = []
-            for line in lines:
-                if 'device' in line and line.strip():
-                    # Split by whitespace and take the first part as device_id
-                    parts = line.split()
-                    if len(parts) >= 2 and parts[1] == 'device':
-                        device_id = parts[0]
-                        devices.append(device_id)
+            devices = [match.group(1).decode('utf-8') for match in _ADB_DEVICE_RE.finditer(stdout)]
             
             logger.info(f"📱 Discovered {len(devices)} device(s): {devices}")
             return devices
@@ -97,31 +356,51 @@ class FarmDeviceManager:
             logger.error(f"Error discovering devices: {e}")
             return []
 
+    async def _run_adb_capture(self, *args: str) -> str:
+        """Run a one-off adb command and return its decoded stdout (stderr is discarded)"""
+        process = await asyncio.create_subprocess_exec(
+            'adb', *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+        return stdout.decode('utf-8')
+
+    async def get_state(self, device_id: str) -> str:
+        """Return a device's adb state ('device', 'offline', ...), via the adb server socket when reachable"""
+        try:
+            return (await adb_server_query(f'host-serial:{device_id}:get-state')).decode('utf-8')
+        except OSError:
+            return await self._run_adb_capture('-s', device_id, 'get-state')
+
+    async def adb_shell_capture(self, device_id: str, command: str) -> str:
+        """Run a one-off shell command and return its output, via the adb server socket when reachable"""
+        try:
+            return (await adb_server_query(f'shell:{command}', transport=device_id)).decode('utf-8')
+        except OSError:
+            return await self._run_adb_capture('-s', device_id, 'shell', command)
+
+    async def check_devices(self, device_ids: List[str]) -> List[str]:
+        """Return those of the given devices that are online, probing each with 'adb get-state'"""
+        states = await asyncio.gather(
+            *(self.get_state(device_id) for device_id in device_ids),
+            return_exceptions=True
+        )
+        return [d for d, state in zip(device_ids, states) if isinstance(state, str) and state.strip() == 'device']
+
     async def get_device_info(self, device_id: str) -> Optional[DeviceInfo]:
         """Get detailed information about a specific device"""
         try:
             logger.debug(f"Getting info for device: {device_id}")
             
-            # Get device model
-            model_process = await asyncio.create_subprocess_exec(
-                'adb', '-s', device_id, 'shell', 'getprop', 'ro.product.model',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            model_stdout, _ = await model_process.communicate()
-            model = model_stdout.decode('utf-8').strip() or "Unknown"
-            
-            # Get Android version
-            version_process = await asyncio.create_subprocess_exec(
-                'adb', '-s', device_id, 'shell', 'getprop', 'ro.build.version.release',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            # All properties and the screen resolution, queued together on the device's
+            # persistent shell, which also leaves it warm for the first action
+            props, resolution = await asyncio.gather(
+                self.get_props(device_id),
+                self.get_screen_resolution(device_id)
             )
-            version_stdout, _ = await version_process.communicate()
-            version = version_stdout.decode('utf-8').strip() or "Unknown"
-            
-            # Get screen resolution
-            resolution = await self.get_screen_resolution(device_id)
+            model = props.get('ro.product.model') or "Unknown"
+            version = props.get('ro.build.version.release') or "Unknown"
             
             device_info = DeviceInfo(
                 device_id=device_id,
@@ -140,17 +419,21 @@ class FarmDeviceManager:
             logger.error(f"Error getting device info for {device_id}: {e}")
             return None
 
+    async def get_props(self, device_id: str) -> Dict[str, str]:
+        """Fetch all of a device's system properties with a single 'getprop' dump (cached until it detaches)"""
+        props = self._prop_cache.get(device_id)
+        if props is None:
+            _, output = await self.get_shell(device_id).run('getprop', capture=True)
+            props = dict(_GETPROP_RE.findall(output))
+            if props:
+                self._prop_cache[device_id] = props
+        return props
+
     async def get_screen_resolution(self, device_id: str) -> Dict[str, int]:
         """Get device screen resolution"""
         try:
-            process = await asyncio.create_subprocess_exec(
-                'adb', '-s', device_id, 'shell', 'wm', 'size',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, _ = await process.communicate()
-            
-            output = stdout.decode('utf-8').strip()
+            _, output = await self.get_shell(device_id).run('wm size', capture=True)
+            output = output.strip()
             if 'Physical size:' in output:
                 size_part = output.split('Physical size:')[1].strip()
                 width, height = map(int, size_part.split('x'))
@@ -163,32 +446,39 @@ class FarmDeviceManager:
             logger.error(f"Error getting screen resolution for {device_id}: {e}")
             return {"width": 1080, "height": 1920}  # Default fallback
 
-    def scale_coordinates(self, x: int, y: int, device_info: DeviceInfo) -> Tuple[int, int]:
-        """Scale coordinates from master device to farm device"""
+    def update_scale(self, device_info: DeviceInfo):
+        """Precompute the device's coordinate scale factors from the current master resolution"""
+        device_info._scale_x = device_info._scale_y = None
         if not self.master_resolution or "input_x_max" not in self.master_resolution or "input_y_max" not in self.master_resolution:
-            logger.warning(f"Master resolution or input max values not available for scaling. Using raw coordinates: ({x}, {y})")
-            return x, y  # No scaling if master resolution or input max unknown
-        
+            return
+
         master_input_x_max = self.master_resolution["input_x_max"]
         master_input_y_max = self.master_resolution["input_y_max"]
 
         if master_input_x_max == 0 or master_input_y_max == 0:
-            logger.error(f"Master input max values are zero, cannot scale. Using raw coordinates: ({x}, {y})")
-            return x, y # Avoid division by zero
+            logger.error(f"Master input max values are zero, cannot scale coordinates for {device_info.device_id}")
+            return # Avoid division by zero
 
         # Scale from master's raw input range to master's pixel resolution
         # Then scale from master's pixel resolution to farm device's pixel resolution
         # Combined: (raw_x / master_input_x_max) * master_pixel_width * (farm_pixel_width / master_pixel_width)
-        # Simplified: (raw_x / master_input_x_max) * farm_pixel_width
-        
-        scaled_x = int((x / master_input_x_max) * device_info.screen_width)
-        scaled_y = int((y / master_input_y_max) * device_info.screen_height)
-        
-        logger.debug(f"Scaling coordinates for {device_info.device_id}: ({x}, {y}) [raw] -> ({scaled_x}, {scaled_y}) [farm_pixel]. "
+        # Simplified: raw_x * (farm_pixel_width / master_input_x_max)
+        device_info._scale_x = device_info.screen_width / master_input_x_max
+        device_info._scale_y = device_info.screen_height / master_input_y_max
+
+        logger.debug(f"Scale for {device_info.device_id}: {device_info._scale_x:.4f}x{device_info._scale_y:.4f}. "
                     f"Master Input Max: {master_input_x_max}x{master_input_y_max}, "
                     f"Farm Device Res: {device_info.screen_width}x{device_info.screen_height}")
-        
-        return scaled_x, scaled_y
+
+    def scale_coordinates(self, x: int, y: int, device_info: DeviceInfo) -> Tuple[int, int]:
+        """Scale coordinates from master device to farm device"""
+        if device_info._scale_x is None:
+            self.update_scale(device_info)
+            if device_info._scale_x is None:
+                logger.warning(f"Master resolution or input max values not available for scaling. Using raw coordinates: ({x}, {y})")
+                return x, y  # No scaling if master resolution or input max unknown
+
+        return int(x * device_info._scale_x), int(y * device_info._scale_y)
 
     def get_uiautomator2_device(self, device_id: str):
         """Get or create uiautomator2 device connection"""
@@ -208,6 +498,24 @@ class FarmDeviceManager:
 
         return self.uiautomator2_devices.get(device_id)
 
+    def drop_uiautomator2_device(self, device_id: str):
+        """Forget a cached uiautomator2 connection so the next action reconnects"""
+        if self.uiautomator2_devices.pop(device_id, None) is not None:
+            logger.debug(f"Dropped cached uiautomator2 connection for {device_id}")
+
+    def get_shell(self, device_id: str) -> AdbShell:
+        """Get or create the persistent adb shell for a device (spawned on first command)"""
+        shell = self.shells.get(device_id)
+        if shell is None:
+            shell = self.shells[device_id] = AdbShell(device_id)
+        return shell
+
+    async def close_shell(self, device_id: str):
+        """Shut down a device's persistent adb shell, if any"""
+        shell = self.shells.pop(device_id, None)
+        if shell is not None:
+            await shell.close()
+
     async def execute_tap_uiautomator2(self, x: int, y: int, device_info: DeviceInfo) -> bool:
         """Execute tap using uiautomator2"""
         try:
@@ -221,8 +529,6 @@ class FarmDeviceManager:
             logger.info(f"✅ {device_info.device_id}: Executed tap at ({x}, {y}) via uiautomator2")
             if self.debug:
                 print(f"🎯 TAP EXECUTED on {device_info.device_id}: ({x}, {y}) via uiautomator2")
-            else:
-                print(f"✅ {device_info.device_id}: TAP executed")
 
             device_info.status = DeviceStatus.CONNECTED
             device_info.error_count = 0
@@ -230,6 +536,8 @@ class FarmDeviceManager:
 
         except Exception as e:
             logger.error(f"Error executing tap via uiautomator2 on {device_info.device_id}: {e}")
+            # The cached session may be dead (agent restarted, device replugged); reconnect next time
+            self.drop_uiautomator2_device(device_info.device_id)
             device_info.error_count += 1
             device_info.status = DeviceStatus.ERROR
             return False
@@ -239,35 +547,23 @@ class FarmDeviceManager:
         try:
             device_info.status = DeviceStatus.EXECUTING
 
-            cmd = ['adb', '-s', device_info.device_id, 'shell', 'input', 'tap', str(x), str(y)]
-            logger.debug(f"{device_info.device_id}: Executing command: {' '.join(cmd)}")
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-
-            stdout_str = stdout.decode('utf-8').strip()
-            stderr_str = stderr.decode('utf-8').strip()
+            cmd = shell_command("input", "tap", x, y)
+            logger.debug("%s: Executing command: %s", device_info.device_id, cmd)
+            returncode, output = await self.get_shell(device_info.device_id).run(cmd)
 
-            if process.returncode == 0:
+            if returncode == 0:
                 logger.info(f"✅ {device_info.device_id}: Executed tap at ({x}, {y}) via ADB")
-                if stdout_str:
-                    logger.debug(f"{device_info.device_id}: Tap stdout: {stdout_str}")
+                if output:
+                    logger.debug("%s: Tap output: %s", device_info.device_id, output)
                 if self.debug:
                     print(f"🎯 TAP EXECUTED on {device_info.device_id}: ({x}, {y}) via ADB")
-                else:
-                    print(f"✅ {device_info.device_id}: TAP executed")
                 device_info.status = DeviceStatus.CONNECTED
                 device_info.error_count = 0
                 return True
             else:
-                logger.error(f"❌ {device_info.device_id}: Failed to execute tap via ADB (Return Code: {process.returncode})")
-                if stdout_str:
-                    logger.error(f"{device_info.device_id}: Tap stdout: {stdout_str}")
-                if stderr_str:
-                    logger.error(f"{device_info.device_id}: Tap stderr: {stderr_str}")
+                logger.error(f"❌ {device_info.device_id}: Failed to execute tap via ADB (Return Code: {returncode})")
+                if output:
+                    logger.error(f"{device_info.device_id}: Tap output: {output}")
                 device_info.error_count += 1
                 device_info.status = DeviceStatus.ERROR
                 return False
@@ -278,8 +574,70 @@ class FarmDeviceManager:
             device_info.status = DeviceStatus.ERROR
             return False
 
+    async def probe_touch_device(self, device_info: DeviceInfo):
+        """Find and cache the device's touchscreen event node and axis ranges (once per device)"""
+        if device_info.touch_probed:
+            return
+        device_info.touch_probed = True
+        try:
+            output = await self.adb_shell_capture(device_info.device_id, 'getevent -p')
+            touch = parse_touch_device(output)
+            if touch:
+                device_info.touch_device, device_info.touch_max_x, device_info.touch_max_y = touch
+                logger.info(f"👆 {device_info.device_id}: Touch device {touch[0]} (max {touch[1]}x{touch[2]})")
+            else:
+                logger.warning(f"{device_info.device_id}: No multi-touch device found, taps will use 'input tap'")
+        except Exception as e:
+            logger.error(f"Error probing touch device on {device_info.device_id}: {e}")
+
+    async def execute_tap_sendevent(self, x: int, y: int, device_info: DeviceInfo) -> bool:
+        """Execute tap by writing raw multi-touch events, skipping the app_process start of 'input'"""
+        try:
+            device_info.status = DeviceStatus.EXECUTING
+
+            # Screen pixels -> touch panel units
+            touch_x = round(x * device_info.touch_max_x / max(device_info.screen_width - 1, 1))
+            touch_y = round(y * device_info.touch_max_y / max(device_info.screen_height - 1, 1))
+
+            # Type B protocol: tracking id, position, BTN_TOUCH down, SYN; then release and SYN
+            events = (
+                (3, 57, 0), (3, 53, touch_x), (3, 54, touch_y), (1, 330, 1), (0, 0, 0),
+                (3, 57, -1), (1, 330, 0), (0, 0, 0),
+            )
+            dev = device_info.touch_device
+            cmd = " && ".join(f"sendevent {dev} {t} {c} {v}" for t, c, v in events)
+            returncode, output = await self.get_shell(device_info.device_id).run(cmd)
+
+            if returncode == 0:
+                logger.info(f"✅ {device_info.device_id}: Executed tap at ({x}, {y}) via sendevent")
+                if self.debug:
+                    print(f"🎯 TAP EXECUTED on {device_info.device_id}: ({x}, {y}) via sendevent")
+                device_info.status = DeviceStatus.CONNECTED
+                device_info.error_count = 0
+                return True
+            else:
+                logger.error(f"❌ {device_info.device_id}: Failed to execute tap via sendevent (Return Code: {returncode})")
+                if output:
+                    logger.error(f"{device_info.device_id}: Tap output: {output}")
+                device_info.error_count += 1
+                device_info.status = DeviceStatus.ERROR
+                return False
+
+        except Exception as e:
+            logger.error(f"Error executing tap via sendevent on {device_info.device_id}: {e}")
+            device_info.error_count += 1
+            device_info.status = DeviceStatus.ERROR
+            return False
+
     async def execute_tap(self, x: int, y: int, device_info: DeviceInfo) -> bool:
         """Execute tap action on device with uiautomator2 first, ADB fallback"""
+        # Raw touch events when enabled and a touchscreen was found
+        if self.use_sendevent and device_info.touch_device:
+            success = await self.execute_tap_sendevent(x, y, device_info)
+            if success:
+                return True
+            logger.warning(f"{device_info.device_id}: sendevent tap failed, falling back")
+
         # Try uiautomator2 first
         if UIAUTOMATOR2_AVAILABLE:
             success = await self.execute_tap_uiautomator2(x, y, device_info)
@@ -305,8 +663,6 @@ class FarmDeviceManager:
             logger.info(f"✅ {device_info.device_id}: Executed long-tap at ({x}, {y}) duration={duration}ms via uiautomator2")
             if self.debug:
                 print(f"🔒 LONG-TAP EXECUTED on {device_info.device_id}: ({x}, {y}) {duration}ms via uiautomator2")
-            else:
-                print(f"✅ {device_info.device_id}: LONG-TAP executed")
 
             device_info.status = DeviceStatus.CONNECTED
             device_info.error_count = 0
@@ -314,6 +670,8 @@ class FarmDeviceManager:
 
         except Exception as e:
             logger.error(f"Error executing long-tap via uiautomator2 on {device_info.device_id}: {e}")
+            # The cached session may be dead (agent restarted, device replugged); reconnect next time
+            self.drop_uiautomator2_device(device_info.device_id)
             device_info.error_count += 1
             device_info.status = DeviceStatus.ERROR
             return False
@@ -324,29 +682,20 @@ class FarmDeviceManager:
             device_info.status = DeviceStatus.EXECUTING
 
             # ADB doesn't have a direct long-tap command, so we simulate it with swipe at the same position
-            cmd = ['adb', '-s', device_info.device_id, 'shell', 'input', 'swipe', str(x), str(y), str(x), str(y), str(duration)]
-            logger.debug(f"{device_info.device_id}: Executing command: {' '.join(cmd)}")
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            cmd = shell_command("input", "swipe", x, y, x, y, duration)
+            logger.debug("%s: Executing command: %s", device_info.device_id, cmd)
+            returncode, output = await self.get_shell(device_info.device_id).run(cmd)
 
-            stdout, stderr = await process.communicate()
-
-            if process.returncode == 0:
+            if returncode == 0:
                 logger.info(f"✅ {device_info.device_id}: Executed long-tap at ({x}, {y}) duration={duration}ms via ADB")
                 if self.debug:
                     print(f"🔒 LONG-TAP EXECUTED on {device_info.device_id}: ({x}, {y}) {duration}ms via ADB")
-                else:
-                    print(f"✅ {device_info.device_id}: LONG-TAP executed")
 
                 device_info.status = DeviceStatus.CONNECTED
                 device_info.error_count = 0
                 return True
             else:
-                error_msg = stderr.decode('utf-8').strip()
-                logger.error(f"ADB long-tap command failed on {device_info.device_id}: {error_msg}")
+                logger.error(f"ADB long-tap command failed on {device_info.device_id}: {output}")
                 device_info.error_count += 1
                 device_info.status = DeviceStatus.ERROR
                 return False
@@ -384,8 +733,6 @@ class FarmDeviceManager:
             logger.info(f"✅ {device_info.device_id}: Executed swipe from ({start_x}, {start_y}) to ({end_x}, {end_y}) duration={duration}ms via uiautomator2")
             if self.debug:
                 print(f"👆 SWIPE EXECUTED on {device_info.device_id}: ({start_x}, {start_y}) → ({end_x}, {end_y}) {duration}ms via uiautomator2")
-            else:
-                print(f"✅ {device_info.device_id}: SWIPE executed")
 
             device_info.status = DeviceStatus.CONNECTED
             device_info.error_count = 0
@@ -393,6 +740,8 @@ class FarmDeviceManager:
 
         except Exception as e:
             logger.error(f"Error executing swipe via uiautomator2 on {device_info.device_id}: {e}")
+            # The cached session may be dead (agent restarted, device replugged); reconnect next time
+            self.drop_uiautomator2_device(device_info.device_id)
             device_info.error_count += 1
             device_info.status = DeviceStatus.ERROR
             return False
@@ -402,35 +751,23 @@ class FarmDeviceManager:
         try:
             device_info.status = DeviceStatus.EXECUTING
 
-            cmd = ['adb', '-s', device_info.device_id, 'shell', 'input', 'swipe', str(start_x), str(start_y), str(end_x), str(end_y), str(duration)]
-            logger.debug(f"{device_info.device_id}: Executing command: {' '.join(cmd)}")
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-
-            stdout_str = stdout.decode('utf-8').strip()
-            stderr_str = stderr.decode('utf-8').strip()
+            cmd = shell_command("input", "swipe", start_x, start_y, end_x, end_y, duration)
+            logger.debug("%s: Executing command: %s", device_info.device_id, cmd)
+            returncode, output = await self.get_shell(device_info.device_id).run(cmd)
 
-            if process.returncode == 0:
+            if returncode == 0:
                 logger.info(f"✅ {device_info.device_id}: Executed swipe from ({start_x}, {start_y}) to ({end_x}, {end_y}) duration={duration}ms via ADB")
-                if stdout_str:
-                    logger.debug(f"{device_info.device_id}: Swipe stdout: {stdout_str}")
+                if output:
+                    logger.debug("%s: Swipe output: %s", device_info.device_id, output)
                 if self.debug:
                     print(f"👆 SWIPE EXECUTED on {device_info.device_id}: ({start_x}, {start_y}) → ({end_x}, {end_y}) {duration}ms via ADB")
-                else:
-                    print(f"✅ {device_info.device_id}: SWIPE executed")
                 device_info.status = DeviceStatus.CONNECTED
                 device_info.error_count = 0
                 return True
             else:
-                logger.error(f"❌ {device_info.device_id}: Failed to execute swipe via ADB (Return Code: {process.returncode})")
-                if stdout_str:
-                    logger.error(f"{device_info.device_id}: Swipe stdout: {stdout_str}")
-                if stderr_str:
-                    logger.error(f"{device_info.device_id}: Swipe stderr: {stderr_str}")
+                logger.error(f"❌ {device_info.device_id}: Failed to execute swipe via ADB (Return Code: {returncode})")
+                if output:
+                    logger.error(f"{device_info.device_id}: Swipe output: {output}")
                 device_info.error_count += 1
                 device_info.status = DeviceStatus.ERROR
                 return False
@@ -459,50 +796,26 @@ class FarmDeviceManager:
             device_info.status = DeviceStatus.EXECUTING
             
             # Convert key codes to Android key event codes
-            key_mapping = {
-                'KEY_BACK': '4',
-                'KEY_HOME': '3',
-                'KEY_MENU': '82',
-                'KEY_POWER': '26',
-                'KEY_VOLUMEUP': '24',
-                'KEY_VOLUMEDOWN': '25',
-                'BTN_BACK': '4',
-                'KEY_ENTER': '66',
-                'KEY_SPACE': '62',
-            }
-            
-            android_key_code = key_mapping.get(key_code, key_code)
-            
-            cmd = ['adb', '-s', device_info.device_id, 'shell', 'input', 'keyevent', android_key_code]
-            logger.debug(f"{device_info.device_id}: Executing command: {' '.join(cmd)}")
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
+            android_key_code = _KEY_MAPPING.get(key_code, key_code)
             
-            stdout_str = stdout.decode('utf-8').strip()
-            stderr_str = stderr.decode('utf-8').strip()
+            cmd = shell_command("input", "keyevent", android_key_code)
+            logger.debug("%s: Executing command: %s", device_info.device_id, cmd)
+            returncode, output = await self.get_shell(device_info.device_id).run(cmd)
 
-            if process.returncode == 0:
+            if returncode == 0:
                 logger.info(f"✅ {device_info.device_id}: Executed key press: {key_code} ({android_key_code})")
-                if stdout_str:
-                    logger.debug(f"{device_info.device_id}: Key press stdout: {stdout_str}")
+                if output:
+                    logger.debug("%s: Key press output: %s", device_info.device_id, output)
                 # Show clean execution in normal mode, detailed in debug mode
                 if self.debug:
                     print(f"⌨️ KEY EXECUTED on {device_info.device_id}: {key_code}")
-                else:
-                    print(f"✅ {device_info.device_id}: KEY executed")
                 device_info.status = DeviceStatus.CONNECTED
                 device_info.error_count = 0
                 return True
             else:
-                logger.error(f"❌ {device_info.device_id}: Failed to execute key press (Return Code: {process.returncode})")
-                if stdout_str:
-                    logger.error(f"{device_info.device_id}: Key press stdout: {stdout_str}")
-                if stderr_str:
-                    logger.error(f"{device_info.device_id}: Key press stderr: {stderr_str}")
+                logger.error(f"❌ {device_info.device_id}: Failed to execute key press (Return Code: {returncode})")
+                if output:
+                    logger.error(f"{device_info.device_id}: Key press output: {output}")
                 device_info.error_count += 1
                 device_info.status = DeviceStatus.ERROR
                 return False
@@ -518,39 +831,25 @@ class FarmDeviceManager:
         try:
             device_info.status = DeviceStatus.EXECUTING
             
-            # Escape special characters for shell
-            escaped_text = text.replace(' ', '%s').replace('&', '\\&').replace('"', '\\"')
-            
-            cmd = ['adb', '-s', device_info.device_id, 'shell', 'input', 'text', escaped_text]
-            logger.debug(f"{device_info.device_id}: Executing command: {' '.join(cmd)}")
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-            
-            stdout_str = stdout.decode('utf-8').strip()
-            stderr_str = stderr.decode('utf-8').strip()
+            # 'input text' reads %s as a space; everything else is quoted for the shell
+            cmd = shell_command("input", "text", text.replace(' ', '%s'))
+            logger.debug("%s: Executing command: %s", device_info.device_id, cmd)
+            returncode, output = await self.get_shell(device_info.device_id).run(cmd)
 
-            if process.returncode == 0:
+            if returncode == 0:
                 logger.info(f"✅ {device_info.device_id}: Executed text input: '{text}'")
-                if stdout_str:
-                    logger.debug(f"{device_info.device_id}: Text input stdout: {stdout_str}")
+                if output:
+                    logger.debug("%s: Text input output: %s", device_info.device_id, output)
                 # Show clean execution in normal mode, detailed in debug mode
                 if self.debug:
                     print(f"📝 TEXT EXECUTED on {device_info.device_id}: '{text}'")
-                else:
-                    print(f"✅ {device_info.device_id}: TEXT executed")
                 device_info.status = DeviceStatus.CONNECTED
                 device_info.error_count = 0
                 return True
             else:
-                logger.error(f"❌ {device_info.device_id}: Failed to execute text input (Return Code: {process.returncode})")
-                if stdout_str:
-                    logger.error(f"{device_info.device_id}: Text input stdout: {stdout_str}")
-                if stderr_str:
-                    logger.error(f"{device_info.device_id}: Text input stderr: {stderr_str}")
+                logger.error(f"❌ {device_info.device_id}: Failed to execute text input (Return Code: {returncode})")
+                if output:
+                    logger.error(f"{device_info.device_id}: Text input output: {output}")
                 device_info.error_count += 1
                 device_info.status = DeviceStatus.ERROR
                 return False
@@ -567,30 +866,16 @@ class FarmDeviceManager:
         device_id = device_info.device_id
         
         try:
-            if action == 'tap_press':
-                # Store tap press, wait for tap_release to execute complete tap
+            if action in ('tap', 'tap_release'):
+                # The master sends one 'tap' per completed tap. Older masters send tap_press on
+                # finger down (ignored below) and tap_release, which is executed at its own coordinates
                 x, y = action_data.get('x'), action_data.get('y')
                 if x is not None and y is not None:
-                    # Scale coordinates
                     x, y = self.scale_coordinates(x, y, device_info)
-                    self.pending_taps[device_id] = {'x': x, 'y': y}
-                    logger.debug(f"{device_id}: Stored tap_press at ({x}, {y})")
-                    # Only show detailed tap press storage in debug mode
-                    if self.debug:
-                        print(f"👆 TAP PRESS STORED on {device_id}: ({x}, {y})")
-            
-            elif action == 'tap_release':
-                # Execute the complete tap action
-                if device_id in self.pending_taps:
-                    pending = self.pending_taps[device_id]
-                    await self.execute_tap(pending['x'], pending['y'], device_info)
-                    del self.pending_taps[device_id]
-                else:
-                    # Fallback: execute tap at release coordinates
-                    x, y = action_data.get('x'), action_data.get('y')
-                    if x is not None and y is not None:
-                        x, y = self.scale_coordinates(x, y, device_info)
-                        await self.execute_tap(x, y, device_info)
+                    await self.execute_tap(x, y, device_info)
+
+            elif action == 'tap_press':
+                pass
 
             elif action == 'swipe':
                 # Execute swipe action
@@ -605,7 +890,7 @@ class FarmDeviceManager:
                     scaled_start_x, scaled_start_y = self.scale_coordinates(start_x, start_y, device_info)
                     scaled_end_x, scaled_end_y = self.scale_coordinates(end_x, end_y, device_info)
 
-                    logger.debug(f"{device_id}: Executing swipe from ({scaled_start_x}, {scaled_start_y}) to ({scaled_end_x}, {scaled_end_y}) duration={duration}ms")
+                    logger.debug("%s: Executing swipe from (%s, %s) to (%s, %s) duration=%sms", device_id, scaled_start_x, scaled_start_y, scaled_end_x, scaled_end_y, duration)
                     await self.execute_swipe(scaled_start_x, scaled_start_y, scaled_end_x, scaled_end_y, duration, device_info)
                 else:
                     logger.warning(f"{device_id}: Invalid swipe coordinates: start=({start_x}, {start_y}), end=({end_x}, {end_y})")
@@ -618,7 +903,7 @@ class FarmDeviceManager:
                 if x is not None and y is not None:
                     # Scale coordinates
                     x, y = self.scale_coordinates(x, y, device_info)
-                    logger.debug(f"{device_id}: Executing long-tap at ({x}, {y}) duration={duration}ms")
+                    logger.debug("%s: Executing long-tap at (%s, %s) duration=%sms", device_id, x, y, duration)
                     await self.execute_long_tap(x, y, duration, device_info)
                 else:
                     logger.warning(f"{device_id}: Invalid long-tap coordinates: ({x}, {y})")
@@ -630,17 +915,27 @@ class FarmDeviceManager:
             
             elif action == 'key_release':
                 # We handle key press/release as single action, so ignore release
-                logger.debug(f"{device_id}: Ignoring key_release for {action_data.get('key_code')}")
+                logger.debug("%s: Ignoring key_release for %s", device_id, action_data.get('key_code'))
             
             elif action == 'text_input':
                 text = action_data.get('text')
                 if text:
                     await self.execute_text_input(text, device_info)
             
+            elif action == 'batch':
+                # Several actions merged into one frame by the central server; run them in the
+                # order the master recorded them
+                for item in action_data.get('items', []):
+                    await self.process_action(item, device_info)
+
             elif action == 'master_resolution_update':
                 resolution = action_data.get('resolution')
                 if resolution and isinstance(resolution, dict) and 'width' in resolution and 'height' in resolution:
-                    self.master_resolution = resolution
+                    # Every farm connection receives the same update; rescale all devices only once per change
+                    if resolution != self.master_resolution:
+                        self.master_resolution = resolution
+                        for known_device in self.devices.values():
+                            self.update_scale(known_device)
                     logger.info(f"{device_id}: Received master resolution update: {resolution['width']}x{resolution['height']}")
                 else:
                     logger.warning(f"{device_id}: Invalid master_resolution_update received: {action_data}")
@@ -655,55 +950,92 @@ class FarmDeviceManager:
             device_info.error_count += 1
             device_info.status = DeviceStatus.ERROR
 
+    def retry_backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter so devices don't reconnect in lockstep"""
+        return self.retry_delay * (1.5 ** attempt) + random.random()
+
     async def connect_websocket(self) -> Optional[object]:
-        """Connect to central server with retry logic"""
-        for attempt in range(self.max_retry_attempts):
-            try:
-                logger.info(f"🔌 Connecting to central server (attempt {attempt + 1}/{self.max_retry_attempts})")
+        """Connect to central server once; handle_device_connection owns the retry backoff"""
+        try:
+            logger.info("🔌 Connecting to central server")
+            async with self._connect_sem:
                 websocket = await asyncio.wait_for(
                     websockets.connect(self.central_server_url),
                     timeout=self.connection_timeout
                 )
-                logger.info(f"✅ Connected to central server: {self.central_server_url}")
-                return websocket
-                
-            except asyncio.TimeoutError:
-                logger.error(f"❌ Connection timeout (attempt {attempt + 1})")
-            except Exception as e:
-                logger.error(f"❌ Connection failed (attempt {attempt + 1}): {e}")
-            
-            if attempt < self.max_retry_attempts - 1:
-                logger.info(f"⏳ Retrying in {self.retry_delay} seconds...")
-                await asyncio.sleep(self.retry_delay)
-        
-        logger.error("❌ Failed to connect after all retry attempts")
+            logger.info(f"✅ Connected to central server: {self.central_server_url}")
+            return websocket
+
+        except asyncio.TimeoutError:
+            logger.error("❌ Connection timeout")
+        except Exception as e:
+            logger.error(f"❌ Connection failed: {e}")
         return None
 
     async def send_device_info(self, websocket, device_info: DeviceInfo):
         """Send device information to central server"""
         try:
-            info_message = {
-                "action": "device_info",
-                "role": "farm",
-                "device_info": {
-                    "id": device_info.device_id,
-                    "model": device_info.model,
-                    "android_version": device_info.android_version,
-                    "screen_width": device_info.screen_width,
-                    "screen_height": device_info.screen_height
+            if device_info._info_payload is None:
+                info_message = {
+                    "action": "device_info",
+                    "role": "farm",
+                    "device_info": {
+                        "id": device_info.device_id,
+                        "model": device_info.model,
+                        "android_version": device_info.android_version,
+                        "screen_width": device_info.screen_width,
+                        "screen_height": device_info.screen_height
+                    }
                 }
-            }
-            await websocket.send(json.dumps(info_message))
+                device_info._info_payload = orjson.dumps(info_message) if ORJSON_AVAILABLE else json.dumps(info_message).encode('utf-8')
+            await websocket.send(device_info._info_payload)
             logger.info(f"📤 Sent device info for {device_info.device_id}: {device_info.model}")
             
         except Exception as e:
             logger.error(f"Failed to send device info for {device_info.device_id}: {e}")
 
+    async def consume_actions(self, device_info: DeviceInfo, inbox: asyncio.Queue):
+        """Execute a device's received actions in order"""
+        while True:
+            action_data = await inbox.get()
+            try:
+                logger.info("%s: Received action: %s", device_info.device_id, action_data) # Changed to INFO for visibility
+
+                # Print received action for visibility in debug mode; normal mode stays quiet per action
+                action_type = action_data.get('action', 'unknown')
+                if self.debug:
+                    if action_type == 'swipe':
+                        start_x, start_y = action_data.get('start_x', 0), action_data.get('start_y', 0)
+                        end_x, end_y = action_data.get('end_x', 0), action_data.get('end_y', 0)
+                        duration = action_data.get('duration', 0)
+                        print(f"📡 RECEIVED on {device_info.device_id}: swipe from ({start_x}, {start_y}) to ({end_x}, {end_y}) duration={duration}ms")
+                    elif action_type == 'long_tap':
+                        x, y = action_data.get('x', 0), action_data.get('y', 0)
+                        duration = action_data.get('duration', 0)
+                        print(f"📡 RECEIVED on {device_info.device_id}: long_tap at ({x}, {y}) duration={duration}ms")
+                    elif 'x' in action_data and 'y' in action_data:
+                        print(f"📡 RECEIVED on {device_info.device_id}: {action_type} at ({action_data['x']}, {action_data['y']})")
+                    else:
+                        print(f"📡 RECEIVED on {device_info.device_id}: {action_type}")
+
+                # Process the action
+                await self.process_action(action_data, device_info)
+
+            except Exception as e:
+                logger.error(f"{device_info.device_id}: Error processing action: {e}")
+                device_info.error_count += 1
+
     async def handle_device_connection(self, device_info: DeviceInfo):
         """Handle WebSocket connection for a single device"""
         retry_count = 0
         
         while retry_count < self.max_retry_attempts:
+            if retry_count:
+                delay = self.retry_backoff(retry_count)
+                logger.info(f"⏳ {device_info.device_id}: Reconnecting in {delay:.1f} seconds... (attempt {retry_count + 1})")
+                await asyncio.sleep(delay)
+
+            websocket = None
             try:
                 device_info.status = DeviceStatus.CONNECTING
                 websocket = await self.connect_websocket()
@@ -715,58 +1047,41 @@ class FarmDeviceManager:
                 device_info.websocket = websocket
                 device_info.status = DeviceStatus.CONNECTED
                 device_info.error_count = 0
-                
-                # Send device info to central server
-                await self.send_device_info(websocket, device_info)
+
+                if self.master_resolution:
+                    self.update_scale(device_info)
+
+                # Per-device setup is adb-heavy; cap how many devices do it at once
+                async with self._setup_sem:
+                    if self.use_sendevent:
+                        await self.probe_touch_device(device_info)
+
+                    # Spawn the device's adb shell now so the first action doesn't pay for it
+                    shell = self.get_shell(device_info.device_id)
+                    if not shell.alive:
+                        try:
+                            await shell.start()
+                        except Exception as e:
+                            logger.warning(f"{device_info.device_id}: Could not prestart adb shell: {e}")
+
+                    # Send device info to central server
+                    await self.send_device_info(websocket, device_info)
                 
                 logger.info(f"🤖 {device_info.device_id}: Ready to receive actions")
                 print(f"🔥 FARM DEVICE READY: {device_info.device_id} ({device_info.model})")
                 
-                # Listen for actions
-                async for message in websocket:
-                    try:
-                        action_data = json.loads(message)
-                        logger.info(f"{device_info.device_id}: Received action: {action_data}") # Changed to INFO for visibility
-
-                        # Print received action for visibility - clean in normal mode, detailed in debug mode
-                        action_type = action_data.get('action', 'unknown')
-                        if self.debug:
-                            if action_type == 'swipe':
-                                start_x, start_y = action_data.get('start_x', 0), action_data.get('start_y', 0)
-                                end_x, end_y = action_data.get('end_x', 0), action_data.get('end_y', 0)
-                                duration = action_data.get('duration', 0)
-                                print(f"📡 RECEIVED on {device_info.device_id}: swipe from ({start_x}, {start_y}) to ({end_x}, {end_y}) duration={duration}ms")
-                            elif action_type == 'long_tap':
-                                x, y = action_data.get('x', 0), action_data.get('y', 0)
-                                duration = action_data.get('duration', 0)
-                                print(f"📡 RECEIVED on {device_info.device_id}: long_tap at ({x}, {y}) duration={duration}ms")
-                            elif 'x' in action_data and 'y' in action_data:
-                                print(f"📡 RECEIVED on {device_info.device_id}: {action_type} at ({action_data['x']}, {action_data['y']})")
-                            else:
-                                print(f"📡 RECEIVED on {device_info.device_id}: {action_type}")
-                        else:
-                            # Clean, simple received action log for normal mode
-                            if action_type in ['tap_press', 'tap_release']:
-                                print(f"📱 {device_info.device_id}: Received TAP action")
-                            elif action_type == 'swipe':
-                                print(f"📱 {device_info.device_id}: Received SWIPE action")
-                            elif action_type == 'long_tap':
-                                print(f"📱 {device_info.device_id}: Received LONG-TAP action")
-                            elif action_type in ['key_press', 'key_release']:
-                                print(f"📱 {device_info.device_id}: Received KEY action")
-                            elif action_type == 'text_input':
-                                print(f"📱 {device_info.device_id}: Received TEXT action")
-                            elif action_type != 'master_resolution_update':  # Don't show resolution updates in normal mode
-                                print(f"📱 {device_info.device_id}: Received {action_type.upper()} action")
-                        
-                        # Process the action
-                        await self.process_action(action_data, device_info)
-                        
-                    except json.JSONDecodeError:
-                        logger.error(f"{device_info.device_id}: Received invalid JSON: {message}")
-                    except Exception as e:
-                        logger.error(f"{device_info.device_id}: Error processing action: {e}")
-                        device_info.error_count += 1
+                # Actions run from an inbox so reading the socket never waits on adb
+                inbox: asyncio.Queue = asyncio.Queue(maxsize=self.inbox_size)
+                consumer = asyncio.create_task(self.consume_actions(device_info, inbox))
+                try:
+                    # Listen for actions
+                    async for message in websocket:
+                        try:
+                            await inbox.put(_loads(message))
+                        except json.JSONDecodeError:
+                            logger.error(f"{device_info.device_id}: Received invalid JSON: {message}")
+                finally:
+                    consumer.cancel()
                 
             except websockets.exceptions.ConnectionClosed:
                 logger.warning(f"🔌 {device_info.device_id}: Connection closed")
@@ -775,14 +1090,17 @@ class FarmDeviceManager:
                 logger.error(f"❌ {device_info.device_id}: Connection error: {e}")
                 device_info.status = DeviceStatus.ERROR
                 device_info.error_count += 1
+            finally:
+                # Drop the old socket before dialing again so it isn't left half-open
+                if websocket is not None:
+                    device_info.websocket = None
+                    await websocket.close()
             
             retry_count += 1
-            if retry_count < self.max_retry_attempts:
-                logger.info(f"⏳ {device_info.device_id}: Reconnecting in {self.retry_delay} seconds... (attempt {retry_count + 1})")
-                await asyncio.sleep(self.retry_delay)
-            else: # Added else block for final error message
-                logger.error(f"❌ {device_info.device_id}: Max retry attempts reached, giving up")
-                device_info.status = DeviceStatus.ERROR
+
+        logger.error(f"❌ {device_info.device_id}: Max retry attempts reached, giving up")
+        device_info.status = DeviceStatus.ERROR
+        await self.close_shell(device_info.device_id)
 
     async def monitor_device_health(self):
         """Monitor device health and connectivity"""
@@ -798,35 +1116,76 @@ class FarmDeviceManager:
                     if current_time - device_info.last_seen > 60:  # 1 minute timeout
                         logger.warning(f"⚠️ {device_id}: No activity for {int(current_time - device_info.last_seen)} seconds")
                 
-                # Rediscover devices periodically
-                current_devices = await self.discover_devices()
-                
-                # Filter out the master device from the discovered list
-                # The 'master_device' attribute is set in the 'run' method
-                filtered_devices = [d for d in current_devices if d != self.master_device]
-
-                # Add new devices
-                for device_id in filtered_devices:
-                    if device_id not in self.devices:
-                        logger.info(f"🆕 New farm device detected: {device_id}")
-                        device_info = await self.get_device_info(device_id)
-                        if device_info:
-                            self.devices[device_id] = device_info
-                            # Start connection for new device
-                            asyncio.create_task(self.handle_device_connection(device_info))
-                
-                # Mark disconnected devices
-                for device_id in list(self.devices.keys()):
-                    if device_id not in filtered_devices:
-                        logger.warning(f"📱 Farm device disconnected: {device_id}")
-                        self.devices[device_id].status = DeviceStatus.DISCONNECTED
-                
                 await asyncio.sleep(self.device_check_interval)
                 
             except Exception as e:
                 logger.error(f"Error in device health monitor: {e}")
                 await asyncio.sleep(self.device_check_interval)
 
+    async def _reconcile_devices(self, current_devices: List[str]):
+        """Onboard newly attached devices and mark vanished ones disconnected"""
+        # Filter out the master device from the discovered list
+        # The 'master_device' attribute is set in the 'run' method
+        filtered_devices = set(current_devices)
+        filtered_devices.discard(self.master_device)
+
+        # Add new devices, querying all of them concurrently
+        new_ids = [d for d in current_devices if d in filtered_devices and d not in self.devices]
+        for device_id in new_ids:
+            logger.info(f"🆕 New farm device detected: {device_id}")
+        infos = await asyncio.gather(*(self.get_device_info(d) for d in new_ids))
+        for device_info in infos:
+            if device_info:
+                self.devices[device_info.device_id] = device_info
+                # Start connection for new device
+                task = asyncio.create_task(self.handle_device_connection(device_info))
+                self._connection_tasks.add(task)
+                task.add_done_callback(self._connection_tasks.discard)
+
+        # Mark disconnected devices
+        for device_id in self.devices.keys() - filtered_devices:
+            logger.warning(f"📱 Farm device disconnected: {device_id}")
+            self.devices[device_id].status = DeviceStatus.DISCONNECTED
+            self._prop_cache.pop(device_id, None)
+            await self.close_shell(device_id)
+
+    async def _track_devices_stream(self):
+        """Follow the adb server's host:track-devices stream, reconciling on every change"""
+        reader, writer = await asyncio.open_connection(ADB_SERVER_HOST, ADB_SERVER_PORT)
+        try:
+            await _adb_server_send(reader, writer, "host:track-devices")
+            logger.info("📡 Tracking device changes via adb server")
+
+            # Each frame is a 4-hex-digit length followed by the full "<serial>\t<state>\n" list
+            while True:
+                length = int(await reader.readexactly(4), 16)
+                payload = (await reader.readexactly(length)).decode('utf-8') if length else ""
+                current_devices = []
+                for line in payload.splitlines():
+                    parts = line.split('\t')
+                    if len(parts) >= 2 and parts[1] == 'device':
+                        current_devices.append(parts[0])
+                await self._reconcile_devices(current_devices)
+        finally:
+            writer.close()
+
+    async def track_devices(self):
+        """Keep self.devices in sync with attached devices, polling 'adb devices' if tracking is unavailable"""
+        while True:
+            try:
+                await self._track_devices_stream()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Device tracking unavailable ({e}), polling 'adb devices' instead")
+
+            # Poll once per interval, then try to re-establish the stream
+            try:
+                await self._reconcile_devices(await self.discover_devices())
+            except Exception as e:
+                logger.error(f"Error rediscovering devices: {e}")
+            await asyncio.sleep(self.device_check_interval)
+
     async def print_status(self):
         """Print periodic status updates"""
         while True:
@@ -855,7 +1214,7 @@ class FarmDeviceManager:
             except Exception as e:
                 logger.error(f"Error printing status: {e}")
 
-    def prompt_for_master_device(self, available_devices: List[str]) -> Optional[str]:
+    async def prompt_for_master_device(self, available_devices: List[str]) -> Optional[str]:
         """Prompt user to specify which device is the master (to exclude from farm)"""
         print("\n" + "="*60)
         print("🎯 MASTER DEVICE EXCLUSION")
@@ -878,7 +1237,7 @@ class FarmDeviceManager:
             print(f"\n🔍 Enter the master device ID to exclude:")
             print(f"   (Available: {', '.join(available_devices)}, or 'none')")
             
-            user_input = input("Master device ID: ").strip()
+            user_input = (await read_line("Master device ID: ")).strip()
             
             if not user_input:
                 print("❌ Please enter a device ID or 'none'")
@@ -896,66 +1255,73 @@ class FarmDeviceManager:
                 print(f"   Available devices: {', '.join(available_devices)}")
                 
                 # Ask if user wants to retry or exit
-                retry = input("\n🔄 Try again? (y/n): ").strip().lower()
+                retry = (await read_line("\n🔄 Try again? (y/n): ")).strip().lower()
                 if retry not in ['y', 'yes']:
                     print("👋 Exiting...")
                     return "EXIT"
 
+    async def find_master_recorder_processes(self) -> List[str]:
+        """Return the command lines of running master-recorder.py processes"""
+        try:
+            # pgrep filters the process table for us: one "<pid> <command line>" per match
+            process = await asyncio.create_subprocess_exec(
+                'pgrep', '-af', 'master-recorder.py',
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL
+            )
+            # Read matches as they stream in rather than buffering the whole output
+            lines = [raw.decode('utf-8', 'replace').rstrip('\n') async for raw in process.stdout]
+            await process.wait()
+            return lines
+        except Exception as e:
+            logger.error(f"Error auto-detecting master device: {e}")
+            return []
+
+    def detect_master_device(self, available_devices: List[str], recorder_processes: List[str]) -> Optional[str]:
+        """Find the device a running master-recorder.py was started with, if any"""
+        logger.info("Attempting to auto-detect master device...")
+        # Check if master-recorder.py is running with a device ID
+        device_set = set(available_devices)
+        master_device = next((token for line in recorder_processes for token in line.split() if token in device_set), None)
+        if master_device:
+            logger.info(f"🔍 Auto-detected master device: {master_device}")
+        return master_device
+
     async def run(self, specific_devices: Optional[List[str]] = None, master_device: Optional[str] = None):
         """Main execution method"""
         logger.info("🚀 Starting Farm Device Manager...")
-        print("🚀 Starting Farm Device Manager...")
         print("=" * 50)
         
-        # Discover devices
+        # With the master and the devices both given, just probe those devices; otherwise one
+        # listing covers both the device filter and master detection. When the master may
+        # need auto-detecting, list recorder processes meanwhile
+        recorder_lookup = asyncio.create_task(self.find_master_recorder_processes()) if master_device is None else None
+        if specific_devices and master_device is not None:
+            available_devices = await self.check_devices(specific_devices)
+        else:
+            available_devices = await self.discover_devices()
+        recorder_processes = await recorder_lookup if recorder_lookup else []
+
         if specific_devices:
             logger.info(f"Using specific devices: {specific_devices}")
-            available_devices = await self.discover_devices()
-            devices_to_use = [d for d in specific_devices if d in available_devices]
+            available_set = set(available_devices)
+            devices_to_use = [d for d in specific_devices if d in available_set]
             if not devices_to_use:
                 logger.error("❌ None of the specified devices are available")
                 return
         else:
-            available_devices = await self.discover_devices()
             devices_to_use = available_devices.copy()
         
         if not devices_to_use:
             logger.error("❌ No devices found. Please connect at least one Android device.")
             return
         
-        # Prompt for master device if not specified
+        # Master device: as given, else auto-detected from running processes, else ask the user
         if master_device is None:
-            master_device = self.prompt_for_master_device(devices_to_use)
+            master_device = self.detect_master_device(available_devices, recorder_processes) or await self.prompt_for_master_device(available_devices)
             if master_device == "EXIT":
                 return
         
-        # Always try to identify the master device if not specified
-        if not master_device:
-            # Try to detect master device by checking running processes
-            try:
-                logger.info("Attempting to auto-detect master device...")
-                process = await asyncio.create_subprocess_exec(
-                    'ps', 'aux',
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                stdout, _ = await process.communicate()
-                output = stdout.decode('utf-8')
-                
-                # Check if master-recorder.py is running with a device ID
-                for line in output.split('\n'):
-                    if 'master-recorder.py' in line and any(device in line for device in available_devices):
-                        for device in available_devices:
-                            if device in line:
-                                master_device = device
-                                logger.info(f"🔍 Auto-detected master device: {master_device}")
-                                print(f"🔍 Auto-detected master device: {master_device}")
-                                break
-                        if master_device:
-                            break
-            except Exception as e:
-                logger.error(f"Error auto-detecting master device: {e}")
-        
         # Store master device ID for use in monitor_device_health
         self.master_device = master_device
 
@@ -963,65 +1329,79 @@ class FarmDeviceManager:
         if master_device and master_device in devices_to_use:
             devices_to_use.remove(master_device)
             logger.info(f"🚫 Excluded master device from farm: {master_device}")
-            print(f"🚫 Excluded master device from farm: {master_device}")
             
             # Get master device model for better logging
             try:
-                master_model_process = await asyncio.create_subprocess_exec(
-                    'adb', '-s', master_device, 'shell', 'getprop', 'ro.product.model',
-                    stdout=asyncio.subprocess.PIPE
-                )
-                master_model_stdout, _ = await master_model_process.communicate()
-                master_model = master_model_stdout.decode('utf-8').strip() or "Unknown"
+                master_props = await self.get_props(master_device)
+                master_model = master_props.get('ro.product.model') or "Unknown"
                 print(f"ℹ️ Master device: {master_device} ({master_model})")
             except Exception as e:
                 logger.error(f"Error getting master device model: {e}")
+            finally:
+                # The master is never driven by the farm, so don't keep its shell around
+                await self.close_shell(master_device)
         
         if not devices_to_use:
             logger.error("❌ No farm devices available after excluding master device.")
-            print("❌ No farm devices available after excluding master device.")
             print("   Please ensure you have multiple devices connected.")
             return
         
-        # Initialize device info and start connection handlers only for farm devices
-        farm_device_tasks = []
-        for device_id in devices_to_use:
-            device_info = await self.get_device_info(device_id)
-            if device_info:
+        # Initialize device info only for farm devices
+        infos = await asyncio.gather(*(self.get_device_info(d) for d in devices_to_use), return_exceptions=True)
+        for device_id, device_info in zip(devices_to_use, infos):
+            if isinstance(device_info, Exception):
+                logger.error(f"Error getting device info for {device_id}: {device_info}")
+            elif device_info:
                 self.devices[device_id] = device_info
-                task = asyncio.create_task(self.handle_device_connection(device_info))
-                farm_device_tasks.append(task)
         
         if not self.devices:
             logger.error("❌ Failed to initialize any devices")
             return
         
         logger.info(f"🎯 Managing {len(self.devices)} farm device(s)")
-        print(f"🎯 Managing {len(self.devices)} farm device(s)")
         
-        # Start tasks
-        tasks = []
-        tasks.extend(farm_device_tasks) # Add farm device connection tasks
-        
-        # Start monitoring tasks
-        tasks.append(asyncio.create_task(self.monitor_device_health()))
-        tasks.append(asyncio.create_task(self.print_status()))
+        # Connection handlers for the farm devices, plus the monitoring tasks
+        coros = [self.handle_device_connection(device_info) for device_info in self.devices.values()]
+        coros += [self.monitor_device_health(), self.track_devices(), self.print_status()]
         
+        tasks = []
         try:
-            # Wait for all tasks
-            await asyncio.gather(*tasks)
-        except KeyboardInterrupt:
+            if hasattr(asyncio, 'TaskGroup'):  # Python 3.11+
+                # If any task crashes the group cancels and awaits the rest
+                async with asyncio.TaskGroup() as task_group:
+                    tasks.extend(task_group.create_task(coro) for coro in coros)
+            else:
+                # Wait for all tasks; shutdown() below cancels whatever is left
+                tasks.extend(asyncio.create_task(coro) for coro in coros)
+                await asyncio.gather(*tasks)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl+C under asyncio.run() arrives here as cancellation of this task
             logger.info("🛑 Shutting down farm device manager...")
-            print("🛑 Shutting down farm device manager...")
+            raise
         except Exception as e:
             logger.error(f"❌ Fatal error: {e}")
+        finally:
+            await self.shutdown(tasks)
+
+    async def shutdown(self, tasks: List[asyncio.Task]):
+        """Cancel and await all manager tasks, then close device connections and adb shells"""
+        tasks = [*tasks, *self._connection_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # An abandoned websocket keeps its own background tasks alive, which stalls asyncio.run() on exit
+        await asyncio.gather(*(d.websocket.close() for d in self.devices.values() if d.websocket), return_exceptions=True)
+        await asyncio.gather(*(self.close_shell(device_id) for device_id in list(self.shells)), return_exceptions=True)
 
 def main():
+    import argparse  # Only the command line needs it, not importers of FarmDeviceManager
+
     parser = argparse.ArgumentParser(description='Farm Device Executor - Manages multiple Android devices in a farm')
     parser.add_argument('devices', nargs='*', help='Specific device IDs to use (optional)')
     parser.add_argument('--server', default='ws://127.0.0.1:8765/farm', help='Central server URL')
     parser.add_argument('--master', help='Master device ID to exclude from farm (optional)')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode with verbose logging')
+    parser.add_argument('--sendevent', action='store_true', help='Inject taps as raw touch events (sendevent) instead of input tap')
     parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO', help='Log level')
 
     args = parser.parse_args()
@@ -1046,19 +1426,23 @@ def main():
     if args.master:
         print(f"🚫 Master device to exclude: {args.master}")
     else:
-        print("❓ Master device will be prompted during execution")
+        print("❓ Master device will be auto-detected, or prompted for during execution")
     
     print(f"🌐 Central server: {args.server}")
     print("")
     
     # Create and run farm manager
-    farm_manager = FarmDeviceManager(args.server, debug=args.debug)
+    farm_manager = FarmDeviceManager(args.server, debug=args.debug, use_sendevent=args.sendevent)
 
     try:
-        asyncio.run(farm_manager.run(
+        coro = farm_manager.run(
             specific_devices=args.devices if args.devices else None,
             master_device=args.master
-        ))
+        )
+        if UVLOOP_AVAILABLE:
+            uvloop.run(coro)
+        else:
+            asyncio.run(coro)
     except KeyboardInterrupt:
         print("\n🛑 Farm Device Executor stopped by user (Ctrl+C)")
     except Exception as e:
@@ -7,12 +7,28 @@ import logging
 import time
 import argparse
 import math
-from typing import Dict, List, Optional, Tuple
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+# uvloop is optional; a faster drop-in event loop for the getevent pipe and websocket traffic (not on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
+
+# orjson is optional; it serializes straight to bytes, which websockets sends as-is
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    _dumps = json.dumps
 
 # Parse command line arguments
 parser = argparse.ArgumentParser(description='Master Recorder for device synchronization')
 parser.add_argument('--debug', action='store_true', help='Enable debug mode with verbose logging')
 args = parser.parse_args()
+_DEBUG: bool = args.debug # Gates the per-event console output in the monitor loop
 
 # Set logging level based on debug flag
 log_level = logging.DEBUG if args.debug else logging.INFO
@@ -23,84 +39,125 @@ logger = logging.getLogger("MasterRecorder")
 # IMPORTANT: This should be the IP address of your Central Server.
 # For an Android emulator on the same PC, "127.0.0.1" (localhost) is correct.
 CENTRAL_SERVER_URL = "ws://127.0.0.1:8765/master"
+RECONNECT_DELAY_MIN = 0.1 # Seconds before the first retry; doubles on each failure in a row
+RECONNECT_DELAY_MAX = 30.0 # Cap on the doubled delay (jitter is added on top)
+RECONNECT_JITTER = 0.5 # Keeps masters restarting together from retrying in lockstep
+
+GETEVENT_READ_SIZE = 65536 # Bytes read from the getevent pipe per call
 
 # --- ADB Event Parsing Regex ---
 # Updated regex to handle different getevent output formats
-EVENT_LINE_REGEX = re.compile(r'(?:\[\s*\d+\.\d+\]\s*)?(/dev/input/event\d+):\s*(\w+)\s*(\w+)\s*([0-9a-fA-F]+)') # Made timestamp optional
-
-current_touch_event = {
-    "x": None,
-    "y": None,
-    "down": False,
-    # Swipe detection fields
-    "start_x": None,
-    "start_y": None,
-    "start_time": None,
-    "is_swiping": False,
-    "swipe_threshold_distance": 200,  # Minimum distance in raw coordinates to consider as swipe
-    "swipe_threshold_time": 50,      # Minimum time in ms to consider as swipe
-    # Long-tap detection fields
-    "long_tap_threshold_time": 500,  # Minimum time in ms to consider as long-tap
-    "long_tap_threshold_distance": 50  # Maximum movement distance to still consider as long-tap
+# Matches raw getevent bytes so the hot loop never decodes a line
+EVENT_LINE_REGEX = re.compile(rb'(?:\[\s*\d+\.\d+\]\s*)?(/dev/input/event\d+):\s*(\w+)\s*(\w+)\s*([0-9a-fA-F]+)', re.ASCII) # Made timestamp optional
+
+# getevent prints types and codes as hex, or by name on some builds; both map to the same kind
+EV_KEY, EV_ABS = 0x01, 0x03
+ABS_MT_POSITION_X, ABS_MT_POSITION_Y, ABS_MT_TRACKING_ID = 0x35, 0x36, 0x39
+_EVENT_TYPES: Dict[bytes, int] = {b'KEY': EV_KEY, b'0001': EV_KEY, b'ABS': EV_ABS, b'0003': EV_ABS}
+_ABS_CODES: Dict[bytes, int] = {
+    b'ABS_MT_POSITION_X': ABS_MT_POSITION_X, b'0035': ABS_MT_POSITION_X,
+    b'ABS_MT_POSITION_Y': ABS_MT_POSITION_Y, b'0036': ABS_MT_POSITION_Y,
+    b'ABS_MT_TRACKING_ID': ABS_MT_TRACKING_ID, b'0039': ABS_MT_TRACKING_ID,
+}
+
+# Max X/Y from 'getevent -p'; matched against the decoded text of the capabilities dump
+# One pass finds both axes: ABS_MT_POSITION_X/ABS_X/0035 and ABS_MT_POSITION_Y/ABS_Y/0036
+CAPS_MAX_REGEX = re.compile(r'(?:ABS_MT_POSITION_|ABS_|003)(?P<axis>[XY56])\s*:\s*.*?\s*max\s*(?P<max>\d+)', re.ASCII)
+_CAPS_AXIS_KEYS: Dict[str, str] = {
+    'X': "ABS_MT_POSITION_X_MAX", '5': "ABS_MT_POSITION_X_MAX",
+    'Y': "ABS_MT_POSITION_Y_MAX", '6': "ABS_MT_POSITION_Y_MAX",
 }
 
-def calculate_distance(x1, y1, x2, y2):
-    """Calculate distance between two points"""
-    return math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+# Device details don't change while the master stays attached, so reconnects reuse them
+_device_info_cache: Dict[str, Dict] = {}  # device_id -> get_device_info() result
+_caps_cache: Dict[Tuple[str, str], Dict[str, int]] = {}  # (device_id, event_path) -> input capabilities
+
+class TouchEvent:
+    """Touch gesture in progress; slotted so the per-event field stores skip a dict"""
+    __slots__ = (
+        'x', 'y', 'down',
+        'start_x', 'start_y', 'start_time', 'is_swiping',
+        'swipe_threshold_distance', 'swipe_threshold_time',
+        'long_tap_threshold_time', 'long_tap_threshold_distance',
+    )
+
+    def __init__(self):
+        self.swipe_threshold_distance = 200  # Minimum distance in raw coordinates to consider as swipe
+        self.swipe_threshold_time = 50       # Minimum time in ms to consider as swipe
+        # Long-tap detection fields
+        self.long_tap_threshold_time = 500   # Minimum time in ms to consider as long-tap
+        self.long_tap_threshold_distance = 50  # Maximum movement distance to still consider as long-tap
+        self.reset()
+
+    def reset(self):
+        """Reset touch event state for next gesture"""
+        self.x: Optional[int] = None
+        self.y: Optional[int] = None
+        self.down = False
+        # Swipe detection fields
+        self.start_x: Optional[int] = None
+        self.start_y: Optional[int] = None
+        self.start_time: Optional[float] = None
+        self.is_swiping = False
+
+current_touch_event = TouchEvent()
+
+# Console descriptions for sent actions that carry a point or a key; anything else is shown by name
+_ACTION_FMT: Dict[str, Callable[[Dict], str]] = {
+    'tap': lambda d: f"tap at ({d['x']}, {d['y']})",
+    'long_tap': lambda d: f"long_tap at ({d['x']}, {d['y']})",
+    'key_press': lambda d: f"key_press key {d['key_code']}",
+    'key_release': lambda d: f"key_release key {d['key_code']}",
+}
+
+def calculate_distance_squared(x1, y1, x2, y2):
+    """Squared distance between two points, for threshold checks without a sqrt"""
+    dx = x2 - x1
+    dy = y2 - y1
+    return dx * dx + dy * dy
 
 def is_swipe_gesture(start_x, start_y, end_x, end_y, start_time, end_time, threshold_distance, threshold_time):
     """Determine if movement qualifies as a swipe gesture"""
     if start_x is None or start_y is None or end_x is None or end_y is None:
         return False
 
-    distance = calculate_distance(start_x, start_y, end_x, end_y)
+    distance_squared = calculate_distance_squared(start_x, start_y, end_x, end_y)
     duration = end_time - start_time
 
-    return distance >= threshold_distance and duration >= threshold_time
+    return distance_squared >= threshold_distance * threshold_distance and duration >= threshold_time
 
 def is_long_tap_gesture(start_x, start_y, end_x, end_y, start_time, end_time, long_tap_threshold_time, long_tap_threshold_distance):
     """Determine if movement qualifies as a long-tap gesture"""
     if start_x is None or start_y is None or end_x is None or end_y is None:
         return False
 
-    distance = calculate_distance(start_x, start_y, end_x, end_y)
+    distance_squared = calculate_distance_squared(start_x, start_y, end_x, end_y)
     duration = end_time - start_time
 
     # Long-tap: held for sufficient time with minimal movement
-    return duration >= long_tap_threshold_time and distance <= long_tap_threshold_distance
-
-def reset_touch_event():
-    """Reset touch event state for next gesture"""
-    global current_touch_event
-    current_touch_event.update({
-        "x": None,
-        "y": None,
-        "down": False,
-        "start_x": None,
-        "start_y": None,
-        "start_time": None,
-        "is_swiping": False
-    })
+    return duration >= long_tap_threshold_time and distance_squared <= long_tap_threshold_distance * long_tap_threshold_distance
+
+def reconnect_delay(delay: float) -> float:
+    """Reconnect delay with jitter added"""
+    return delay + random.random() * RECONNECT_JITTER
 
 async def connect_websocket():
-    while True:
-        try:
-            websocket = await websockets.connect(CENTRAL_SERVER_URL)
-            logger.info(f"Connected to Central Server: {CENTRAL_SERVER_URL}")
-            return websocket
-        except Exception as e:
-            logger.error(f"WebSocket connection failed: {e}. Retrying in 5 seconds...")
-            await asyncio.sleep(5)
+    """Connect to the Central Server once; main() owns the retry backoff"""
+    try:
+        websocket = await websockets.connect(CENTRAL_SERVER_URL)
+        logger.info(f"Connected to Central Server: {CENTRAL_SERVER_URL}")
+        return websocket
+    except Exception as e:
+        logger.error(f"WebSocket connection failed: {e}")
+        return None
 
 async def send_action(websocket, action_data):
     if websocket:
         try:
-            await websocket.send(json.dumps(action_data))
-            action_desc = action_data['action']
-            if 'x' in action_data and 'y' in action_data:
-                action_desc += f" at ({action_data['x']}, {action_data['y']})"
-            elif 'key_code' in action_data:
-                action_desc += f" key {action_data['key_code']}"
+            await websocket.send(_dumps(action_data))
+            action = action_data['action']
+            fmt = _ACTION_FMT.get(action)
+            action_desc = fmt(action_data) if fmt else action
             logger.info(f"Sent action: {action_desc}")
             print(f"📤 SENT TO CENTRAL SERVER: {action_desc}")
         except websockets.exceptions.ConnectionClosedOK:
@@ -131,16 +188,12 @@ async def get_available_devices():
             logger.error(f"ADB devices command failed: {stderr.decode('utf-8')}")
             return []
         
-        output = stdout.decode('utf-8').strip()
-        lines = output.split('\n')[1:]  # Skip header
-        
         devices = []
-        for line in lines:
-            if 'device' in line and line.strip():
-                parts = line.split()
-                if len(parts) >= 2 and parts[1] == 'device':
-                    device_id = parts[0]
-                    devices.append(device_id)
+        for line in stdout.decode('utf-8').splitlines()[1:]:  # Skip header
+            # "<serial> <state> [key:value ...]"; split only as far as the state column
+            parts = line.split(None, 2)
+            if len(parts) >= 2 and parts[1] == 'device':
+                devices.append(parts[0])
         
         return devices
     except Exception as e:
@@ -196,21 +249,80 @@ async def prompt_for_master_device():
                 print("👋 Exiting...")
                 return None
 
-async def validate_device_connection(device_id):
+class AdbShell:
+    """A long-lived 'adb -s <id> shell' that runs the recorder's device queries over its stdin"""
+
+    SENTINEL = "__MASTER_RC__"  # Echoed after each command with its exit code
+
+    def __init__(self, device_id: str, timeout: float = 15.0):
+        self.device_id = device_id
+        self.timeout = timeout
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        """Spawn the shell process; adb's own errors (e.g. device not found) come back on stdout"""
+        self.process = await asyncio.create_subprocess_exec(
+            'adb', '-s', self.device_id, 'shell',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        logger.debug("%s: Started persistent adb shell (pid %s)", self.device_id, self.process.pid)
+
+    async def run(self, command: str) -> Tuple[int, str]:
+        """Run a shell command, returning its exit code and stdout (add '2>&1' to the command for stderr)"""
+        async with self._lock:
+            if not self.alive:
+                await self.start()
+            try:
+                return await asyncio.wait_for(self._run(command), timeout=self.timeout)
+            except BaseException:
+                # Output of the interrupted command may still arrive; start clean next time
+                await self.close()
+                raise
+
+    async def _run(self, command: str) -> Tuple[int, str]:
+        self.process.stdin.write(f"{{ {command}; }} 2>/dev/null; echo {self.SENTINEL}$?\n".encode('utf-8'))
+        await self.process.stdin.drain()
+        output = []
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise ConnectionError(f"adb shell for {self.device_id} exited: {' '.join(output).strip()}")
+            text = line.decode('utf-8', errors='replace').rstrip('\r\n')
+            # Output without a trailing newline leaves the sentinel at the end of its last line
+            marker = text.rfind(self.SENTINEL)
+            if marker != -1:
+                if marker:
+                    output.append(text[:marker])
+                return int(text[marker + len(self.SENTINEL):]), '\n'.join(output)
+            output.append(text)
+
+    async def close(self):
+        """Terminate the shell process"""
+        process, self.process = self.process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+async def validate_device_connection(device_id, shell: AdbShell):
     """Validate that the device is accessible via ADB"""
     try:
         logger.info(f"🔍 Validating connection to device: {device_id}")
         
-        # Test basic ADB connection
-        process = await asyncio.create_subprocess_exec(
-            'adb', '-s', device_id, 'shell', 'echo', 'connection_test',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
+        # Test basic ADB connection (this also opens the shell the other queries reuse)
+        returncode, output = await shell.run('echo connection_test')
         
-        if process.returncode != 0:
-            logger.error(f"❌ Cannot connect to device {device_id}: {stderr.decode('utf-8')}")
+        if returncode != 0:
+            logger.error(f"❌ Cannot connect to device {device_id}: {output}")
             return False
             
         logger.info(f"✅ Device {device_id} is accessible")
@@ -220,17 +332,10 @@ async def validate_device_connection(device_id):
         logger.error(f"❌ Error validating device {device_id}: {e}")
         return False
 
-async def get_screen_resolution(device_id: str) -> Dict[str, int]:
-    """Get device screen resolution"""
+def parse_screen_resolution(device_id: str, output: str) -> Dict[str, int]:
+    """Parse 'wm size' output into a resolution dict"""
     try:
-        process = await asyncio.create_subprocess_exec(
-            'adb', '-s', device_id, 'shell', 'wm', 'size',
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await process.communicate()
-        
-        output = stdout.decode('utf-8').strip()
+        output = output.strip()
         if 'Physical size:' in output:
             size_part = output.split('Physical size:')[1].strip()
             width, height = map(int, size_part.split('x'))
@@ -243,71 +348,84 @@ async def get_screen_resolution(device_id: str) -> Dict[str, int]:
         logger.error(f"Error getting screen resolution for {device_id}: {e}")
         return {"width": 1080, "height": 1920}  # Default fallback
 
-async def get_device_info(device_id):
-    """Get device information for debugging"""
+async def get_screen_resolution(device_id: str) -> Dict[str, int]:
+    """Get device screen resolution"""
     try:
-        # Get device model
-        model_process = await asyncio.create_subprocess_exec(
-            'adb', '-s', device_id, 'shell', 'getprop', 'ro.product.model',
-            stdout=asyncio.subprocess.PIPE
-        )
-        model_stdout, _ = await model_process.communicate()
-        model = model_stdout.decode('utf-8').strip()
-        
-        # Get Android version
-        version_process = await asyncio.create_subprocess_exec(
-            'adb', '-s', device_id, 'shell', 'getprop', 'ro.build.version.release',
-            stdout=asyncio.subprocess.PIPE
+        process = await asyncio.create_subprocess_exec(
+            'adb', '-s', device_id, 'shell', 'wm', 'size',
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
         )
-        version_stdout, _ = await version_process.communicate()
-        version = version_stdout.decode('utf-8').strip()
-        
-        # Get screen resolution
-        resolution = await get_screen_resolution(device_id)
+        stdout, _ = await process.communicate()
+        return parse_screen_resolution(device_id, stdout.decode('utf-8'))
+            
+    except Exception as e:
+        logger.error(f"Error getting screen resolution for {device_id}: {e}")
+        return {"width": 1080, "height": 1920}  # Default fallback
 
-        return {
+async def get_device_info(device_id, shell: AdbShell):
+    """Get device information for debugging"""
+    cached = _device_info_cache.get(device_id)
+    if cached is not None:
+        return cached
+    try:
+        # Model, Android version and screen size in one shell round-trip, '---' between sections
+        _, output = await shell.run('getprop ro.product.model; echo ---; getprop ro.build.version.release; echo ---; wm size')
+        sections = output.split('---')
+        model = sections[0].strip()
+        version = sections[1].strip() if len(sections) > 1 else ""
+        resolution = parse_screen_resolution(device_id, sections[2] if len(sections) > 2 else "")
+
+        device_info = {
             "id": device_id,
             "model": model,
             "android_version": version,
             "screen_width": resolution["width"],
             "screen_height": resolution["height"]
         }
+        if model:
+            _device_info_cache[device_id] = device_info
+        return device_info
     except Exception as e:
         logger.error(f"Error getting device info: {e}")
         return {"id": device_id, "model": "Unknown", "android_version": "Unknown", "screen_width": 0, "screen_height": 0}
 
-async def get_input_device_capabilities(device_id: str, event_path: str) -> Dict[str, int]:
+async def get_input_device_capabilities(device_id: str, event_path: str, shell: AdbShell) -> Dict[str, int]:
     """Get input device capabilities (e.g., max X/Y values)"""
+    cached = _caps_cache.get((device_id, event_path))
+    if cached is not None:
+        return cached
     capabilities = {"ABS_MT_POSITION_X_MAX": 0, "ABS_MT_POSITION_Y_MAX": 0}
     try:
         logger.info(f"🔍 Getting capabilities for {event_path} on {device_id}")
-        process = await asyncio.create_subprocess_exec(
-            'adb', '-s', device_id, 'shell', 'getevent', '-p', event_path,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await process.communicate()
-        output = stdout.decode('utf-8').strip()
-        logger.debug(f"Raw getevent -p output for {event_path}:\n{output}")
+        _, output = await shell.run(f'getevent -p {event_path}')
+        output = output.strip()
+        logger.debug("Raw getevent -p output for %s:\n%s", event_path, output)
 
         # More flexible regex to find max values for ABS_MT_POSITION_X/Y or ABS_X/Y
         # It looks for 'ABS_MT_POSITION_X', 'ABS_X', 'ABS_MT_POSITION_Y', 'ABS_Y'
         # and captures the 'max' value.
-        x_max_match = re.search(r'(?:ABS_MT_POSITION_X|ABS_X|0035)\s*:\s*.*?\s*max\s*(\d+)', output)
-        y_max_match = re.search(r'(?:ABS_MT_POSITION_Y|ABS_Y|0036)\s*:\s*.*?\s*max\s*(\d+)', output)
-
-        if x_max_match:
-            capabilities["ABS_MT_POSITION_X_MAX"] = int(x_max_match.group(1))
-            logger.debug(f"Found ABS_MT_POSITION_X_MAX: {capabilities['ABS_MT_POSITION_X_MAX']}")
+        found: Dict[str, int] = {}
+        for match in CAPS_MAX_REGEX.finditer(output):
+            found.setdefault(_CAPS_AXIS_KEYS[match.group('axis')], int(match.group('max')))
+        x_max_found = "ABS_MT_POSITION_X_MAX" in found
+        y_max_found = "ABS_MT_POSITION_Y_MAX" in found
+
+        if x_max_found:
+            capabilities["ABS_MT_POSITION_X_MAX"] = found["ABS_MT_POSITION_X_MAX"]
+            logger.debug("Found ABS_MT_POSITION_X_MAX: %s", capabilities["ABS_MT_POSITION_X_MAX"])
         else:
             logger.warning(f"Could not find ABS_MT_POSITION_X or ABS_X max for {event_path}.")
         
-        if y_max_match:
-            capabilities["ABS_MT_POSITION_Y_MAX"] = int(y_max_match.group(1))
-            logger.debug(f"Found ABS_MT_POSITION_Y_MAX: {capabilities['ABS_MT_POSITION_Y_MAX']}")
+        if y_max_found:
+            capabilities["ABS_MT_POSITION_Y_MAX"] = found["ABS_MT_POSITION_Y_MAX"]
+            logger.debug("Found ABS_MT_POSITION_Y_MAX: %s", capabilities["ABS_MT_POSITION_Y_MAX"])
         else:
             logger.warning(f"Could not find ABS_MT_POSITION_Y or ABS_Y max for {event_path}.")
             
+        if x_max_found and y_max_found:
+            # Only real readings are kept; defaults are retried on the next reconnect
+            _caps_cache[(device_id, event_path)] = capabilities
         if capabilities["ABS_MT_POSITION_X_MAX"] == 0 or capabilities["ABS_MT_POSITION_Y_MAX"] == 0:
             logger.warning(f"Final max X/Y capabilities are zero for {event_path}. Falling back to defaults.")
             # Fallback to common large values if not found, to prevent division by zero or tiny scaling
@@ -320,19 +438,33 @@ async def get_input_device_capabilities(device_id: str, event_path: str) -> Dict
         logger.error(f"Error getting input device capabilities for {event_path} on {device_id}: {e}")
         return {"ABS_MT_POSITION_X_MAX": 4095, "ABS_MT_POSITION_Y_MAX": 4095} # Default fallback
 
-async def monitor_adb_events(websocket, device_id):
-    global current_touch_event
+async def drain_getevent_stderr(stream: asyncio.StreamReader) -> None:
+    """Log getevent's stderr lines until the process closes it"""
+    while True:
+        stderr_data = await stream.readline()
+        if not stderr_data:
+            return
+        stderr_str = stderr_data.decode('utf-8', errors='ignore').strip()
+        print(f"❌ GETEVENT ERROR: {stderr_str}")
+        logger.error(f"getevent error: {stderr_str}")
+        if "permission denied" in stderr_str.lower():
+            logger.error("Permission denied. Try running the script with sudo or fix ADB permissions.")
 
+async def monitor_adb_events(websocket, device_id):
     logger.info(f"Starting ADB shell getevent monitor for device: {device_id}")
+    # One shell serves every query below; only the getevent stream gets its own adb process
+    shell = AdbShell(device_id)
+    process: Optional[asyncio.subprocess.Process] = None
+    stderr_task: Optional[asyncio.Task] = None
     
     try:
         # Validate device connection
-        if not await validate_device_connection(device_id):
+        if not await validate_device_connection(device_id, shell):
             logger.error(f"❌ Cannot establish connection to device: {device_id}")
             return
         
         # Get and log device information
-        device_info = await get_device_info(device_id)
+        device_info = await get_device_info(device_id, shell)
         logger.info(f"Master device: {device_info['model']} (Android {device_info['android_version']}, ID: {device_info['id']})")
         
         # Send device info to central server for debugging
@@ -348,32 +480,20 @@ async def monitor_adb_events(websocket, device_id):
         logger.info(f"Using device: {device_id}")
         
         # Check if we can run a simple ADB command first
-        test_process = await asyncio.create_subprocess_exec(
-            'adb', '-s', device_id, 'shell', 'echo', 'ADB connection test', # Added -s device_id
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await test_process.communicate()
+        returncode, output = await shell.run("echo 'ADB connection test'")
         
-        if test_process.returncode != 0:
-            logger.error(f"ADB test failed: {stderr.decode('utf-8')}")
+        if returncode != 0:
+            logger.error(f"ADB test failed: {output}")
             return
             
         logger.info("ADB connection test successful")
         
         # Test if getevent works at all
         logger.info("Testing getevent availability...")
-        test_getevent = await asyncio.create_subprocess_exec(
-            'adb', '-s', device_id, 'shell', 'getevent', '--help', # Added -s device_id
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        test_stdout, test_stderr = await test_getevent.communicate()
-        print(f"🧪 GETEVENT TEST - Return code: {test_getevent.returncode}")
-        if test_stdout:
-            print(f"🧪 GETEVENT STDOUT: {test_stdout.decode('utf-8')[:200]}...")
-        if test_stderr:
-            print(f"🧪 GETEVENT STDERR: {test_stderr.decode('utf-8')[:200]}...")
+        returncode, test_output = await shell.run('getevent --help 2>&1')
+        print(f"🧪 GETEVENT TEST - Return code: {returncode}")
+        if test_output:
+            print(f"🧪 GETEVENT OUTPUT: {test_output[:200]}...")
         
         # Now try to run getevent
         logger.info("Starting getevent monitor...")
@@ -386,22 +506,10 @@ async def monitor_adb_events(websocket, device_id):
         
         print(f"📋 Process started with PID: {process.pid}")
         
-        # Check if stderr has any immediate errors
-        print("🔍 Checking for immediate errors...")
-        try:
-            stderr_data = await asyncio.wait_for(process.stderr.readline(), timeout=2.0)
-            if stderr_data:
-                stderr_str = stderr_data.decode('utf-8')
-                print(f"❌ GETEVENT ERROR: {stderr_str}")
-                logger.error(f"getevent error: {stderr_str}")
-                if "permission denied" in stderr_str.lower():
-                    logger.error("Permission denied. Try running the script with sudo or fix ADB permissions.")
-                return
-            else:
-                print("✅ No immediate errors from getevent")
-        except asyncio.TimeoutError:
-            print("✅ No immediate errors (timeout reached)")
-            
+        # Report getevent errors as they arrive instead of waiting on stderr before reading events;
+        # a getevent that fails exits, and the stdout loop below sees that as end of stream
+        stderr_task = asyncio.create_task(drain_getevent_stderr(process.stderr))
+
         logger.info("getevent started successfully, waiting for events...")
         logger.info("Please interact with the emulator (tap, swipe, etc.) to generate events.")
         print("🔥 GETEVENT MONITOR STARTED - Tap on your emulator now!")
@@ -418,282 +526,301 @@ async def monitor_adb_events(websocket, device_id):
         master_input_x_max = 0
         master_input_y_max = 0
         input_device_path_identified = False
+        # Locals for everything the per-event loop touches, so lookups stay LOAD_FAST
+        match_event = EVENT_LINE_REGEX.match
+        event_kind_of = _EVENT_TYPES.get
+        abs_code_of = _ABS_CODES.get
+        debug = _DEBUG
+        touch = current_touch_event
+        now = time.time
+
+        read_chunk = process.stdout.read
+        pending = b''
 
         while True:
-            line = await process.stdout.readline()
-            if not line:
+            # Read whatever getevent has buffered and split it in bulk instead of one readline() per event
+            chunk = await read_chunk(GETEVENT_READ_SIZE)
+            if not chunk:
                 print("❌ No more data from getevent process")
                 logger.warning("ADB getevent stream ended or process died. Attempting to restart monitor...")
                 break # Break from this loop, main() will try to reconnect
- 
-            event_count += 1
-            line_str = line.decode('utf-8', errors='ignore').strip()
-            logger.debug(f"Raw event line from adb getevent: {line_str}") # More descriptive log
-
-            # Print raw events to console for debugging (only in debug mode)
-            if args.debug:
-                print(f"📱 RAW EVENT #{event_count}: {line_str}")
-
-            match = EVENT_LINE_REGEX.match(line_str)
-            if not match:
-                if args.debug:
-                    print(f"⚠️  Event didn't match regex pattern")
-                continue
-
-            device_path, event_type, event_code, event_value = match.groups()
-            logger.debug(f"Parsed event: Device={device_path}, Type={event_type}, Code={event_code}, Value={event_value}") # Log parsed components
-            if args.debug:
-                print(f"🔍 PARSED: Device={device_path}, Type={event_type}, Code={event_code}, Value={event_value}")
-
-            if not input_device_path_identified and (event_type == 'ABS' or event_type == '0003'):
-                # This is the first ABS event, try to get input device capabilities
-                logger.info(f"First ABS event from {device_path}. Getting input device capabilities...")
-                caps = await get_input_device_capabilities(device_id, device_path)
-                master_input_x_max = caps["ABS_MT_POSITION_X_MAX"]
-                master_input_y_max = caps["ABS_MT_POSITION_Y_MAX"]
-                input_device_path_identified = True
-                logger.info(f"Master input device capabilities: X_MAX={master_input_x_max}, Y_MAX={master_input_y_max}")
-                print(f"📏 MASTER INPUT CAPS: X_MAX={master_input_x_max}, Y_MAX={master_input_y_max}")
-
-                # Send master resolution update to central server
-                master_resolution_data = {
-                    "action": "master_resolution_update",
-                    "resolution": {
-                        "width": master_screen_width,
-                        "height": master_screen_height,
-                        "input_x_max": master_input_x_max,
-                        "input_y_max": master_input_y_max
+
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop() # Partial last line, completed by the next chunk
+            for line in lines:
+                event_count += 1
+                line = line.rstrip()
+
+                # Print raw events to console for debugging (only in debug mode)
+                if debug:
+                    line_str = line.decode('utf-8', errors='ignore')
+                    logger.debug("Raw event line from adb getevent: %s", line_str) # More descriptive log
+                    print(f"📱 RAW EVENT #{event_count}: {line_str}")
+
+                # Fast path: "[ timestamp] /dev/input/eventN: TYPE CODE VALUE" splits cleanly
+                if line.startswith(b'['):
+                    line = line.partition(b']')[2]
+                parts = line.split()
+                if len(parts) == 4 and parts[0].endswith(b':') and parts[0].startswith(b'/dev/input/event'):
+                    device_path, event_type, event_code, event_value = parts
+                    device_path = device_path[:-1]
+                else:
+                    # Fall back to the regex for anything that isn't a plain event line
+                    match = match_event(line)
+                    if not match:
+                        if debug:
+                            print(f"⚠️  Event didn't match regex pattern")
+                        continue
+                    device_path, event_type, event_code, event_value = match.groups()
+                if debug:
+                    parsed = f"Device={device_path.decode()}, Type={event_type.decode()}, Code={event_code.decode()}, Value={event_value.decode()}"
+                    logger.debug("Parsed event: %s", parsed) # Log parsed components
+                    print(f"🔍 PARSED: {parsed}")
+
+                event_kind = event_kind_of(event_type)
+                if not input_device_path_identified and event_kind == EV_ABS:
+                    # This is the first ABS event, try to get input device capabilities
+                    event_path = device_path.decode()
+                    logger.info(f"First ABS event from {event_path}. Getting input device capabilities...")
+                    caps = await get_input_device_capabilities(device_id, event_path, shell)
+                    master_input_x_max = caps["ABS_MT_POSITION_X_MAX"]
+                    master_input_y_max = caps["ABS_MT_POSITION_Y_MAX"]
+                    input_device_path_identified = True
+                    logger.info(f"Master input device capabilities: X_MAX={master_input_x_max}, Y_MAX={master_input_y_max}")
+                    print(f"📏 MASTER INPUT CAPS: X_MAX={master_input_x_max}, Y_MAX={master_input_y_max}")
+
+                    # Send master resolution update to central server
+                    master_resolution_data = {
+                        "action": "master_resolution_update",
+                        "resolution": {
+                            "width": master_screen_width,
+                            "height": master_screen_height,
+                            "input_x_max": master_input_x_max,
+                            "input_y_max": master_input_y_max
+                        }
                     }
-                }
-                logger.info(f"Sending master resolution update: {master_resolution_data}")
-                await send_action(websocket, master_resolution_data)
+                    logger.info(f"Sending master resolution update: {master_resolution_data}")
+                    await send_action(websocket, master_resolution_data)
  
-            # Handle both hex codes (0003) and text codes (ABS)
-            if event_type == 'ABS' or event_type == '0003': # Absolute events like touch positions
-                # Convert hex event value to integer
-                try:
-                    # Try converting as hex first, then as decimal
-                    event_value_int = int(event_value, 16)
-                except ValueError:
-                    # Fallback to decimal if hex conversion fails
-                    event_value_int = int(event_value)
-                
-                # Handle X position (0035 = ABS_MT_POSITION_X)
-                if event_code == 'ABS_MT_POSITION_X' or event_code == '0035':
-                    current_touch_event["x"] = event_value_int # Store raw value
-                    if args.debug:
-                        print(f"👆 TOUCH X (raw): {event_value_int}")
-
-                    # If finger is down and we don't have start coordinates yet, capture them
-                    if (current_touch_event["down"] and
-                        current_touch_event["start_x"] is None and
-                        current_touch_event["y"] is not None):
-                        current_touch_event["start_x"] = event_value_int
-                        current_touch_event["start_y"] = current_touch_event["y"]
-                        current_touch_event["start_time"] = time.time() * 1000
-                        if args.debug:
-                            print(f"🎯 SWIPE START CAPTURED: ({current_touch_event['start_x']}, {current_touch_event['start_y']}) at {current_touch_event['start_time']}")
-
-                # Handle Y position (0036 = ABS_MT_POSITION_Y)
-                elif event_code == 'ABS_MT_POSITION_Y' or event_code == '0036':
-                    current_touch_event["y"] = event_value_int # Store raw value
-                    if args.debug:
-                        print(f"👆 TOUCH Y (raw): {event_value_int}")
-
-                    # If finger is down and we don't have start coordinates yet, capture them
-                    if (current_touch_event["down"] and
-                        current_touch_event["start_y"] is None and
-                        current_touch_event["x"] is not None):
-                        current_touch_event["start_x"] = current_touch_event["x"]
-                        current_touch_event["start_y"] = event_value_int
-                        current_touch_event["start_time"] = time.time() * 1000
-                        if args.debug:
-                            print(f"🎯 SWIPE START CAPTURED: ({current_touch_event['start_x']}, {current_touch_event['start_y']}) at {current_touch_event['start_time']}")
-                # Handle tracking ID (0039 = ABS_MT_TRACKING_ID)
-                elif event_code == 'ABS_MT_TRACKING_ID' or event_code == '0039':
-                    # ffffffff (4294967295) indicates finger UP (release)
-                    # Any other value indicates finger DOWN (press)
-                    if event_value_int == 4294967295 or event_value == 'ffffffff': # Finger UP (release)
-                        if args.debug:
-                            print(f"👆 FINGER UP (RELEASE)")
-
-                        if current_touch_event["down"] and current_touch_event["x"] is not None and current_touch_event["y"] is not None:
-                            end_time = time.time() * 1000  # Convert to milliseconds
-
-                            # Check if this is a swipe gesture
-                            if (current_touch_event["start_x"] is not None and
-                                current_touch_event["start_y"] is not None and
-                                current_touch_event["start_time"] is not None):
-
-                                # Calculate gesture metrics for debugging
-                                distance = calculate_distance(
-                                    current_touch_event["start_x"], current_touch_event["start_y"],
-                                    current_touch_event["x"], current_touch_event["y"]
-                                )
-                                duration = end_time - current_touch_event["start_time"]
-
-                                if args.debug:
-                                    print(f"🔍 GESTURE ANALYSIS: distance={distance:.1f}px, duration={duration:.1f}ms")
-                                    print(f"🔍 SWIPE THRESHOLDS: min_distance={current_touch_event['swipe_threshold_distance']}px, min_time={current_touch_event['swipe_threshold_time']}ms")
-                                    print(f"🔍 LONG-TAP THRESHOLDS: min_time={current_touch_event['long_tap_threshold_time']}ms, max_distance={current_touch_event['long_tap_threshold_distance']}px")
-                                    print(f"🔍 START: ({current_touch_event['start_x']}, {current_touch_event['start_y']}) → END: ({current_touch_event['x']}, {current_touch_event['y']})")
-
-                                # Check for different gesture types
-                                is_swipe = is_swipe_gesture(
-                                    current_touch_event["start_x"], current_touch_event["start_y"],
-                                    current_touch_event["x"], current_touch_event["y"],
-                                    current_touch_event["start_time"], end_time,
-                                    current_touch_event["swipe_threshold_distance"],
-                                    current_touch_event["swipe_threshold_time"]
-                                )
-
-                                is_long_tap = is_long_tap_gesture(
-                                    current_touch_event["start_x"], current_touch_event["start_y"],
-                                    current_touch_event["x"], current_touch_event["y"],
-                                    current_touch_event["start_time"], end_time,
-                                    current_touch_event["long_tap_threshold_time"],
-                                    current_touch_event["long_tap_threshold_distance"]
-                                )
-
-                                if args.debug:
-                                    gesture_type = "SWIPE" if is_swipe else ("LONG-TAP" if is_long_tap else "TAP")
-                                    print(f"🔍 GESTURE DECISION: {gesture_type}")
-                                    print(f"🔍   - SWIPE: distance >= {current_touch_event['swipe_threshold_distance']} ({distance >= current_touch_event['swipe_threshold_distance']}) AND duration >= {current_touch_event['swipe_threshold_time']} ({duration >= current_touch_event['swipe_threshold_time']})")
-                                    print(f"🔍   - LONG-TAP: duration >= {current_touch_event['long_tap_threshold_time']} ({duration >= current_touch_event['long_tap_threshold_time']}) AND distance <= {current_touch_event['long_tap_threshold_distance']} ({distance <= current_touch_event['long_tap_threshold_distance']})")
-
-                                if is_swipe:
-                                    # Send swipe event
-                                    duration = int(end_time - current_touch_event["start_time"])
-                                    action_data = {
-                                        "action": "swipe",
-                                        "start_x": current_touch_event["start_x"],
-                                        "start_y": current_touch_event["start_y"],
-                                        "end_x": current_touch_event["x"],
-                                        "end_y": current_touch_event["y"],
-                                        "duration": duration,
-                                        "device_path": device_path
-                                    }
-                                    logger.debug(f"Preparing to send swipe: {action_data}")
-                                    # Show clean action in normal mode, detailed in debug mode
-                                    if args.debug:
-                                        print(f"🚀 SENDING: swipe from ({current_touch_event['start_x']}, {current_touch_event['start_y']}) to ({current_touch_event['x']}, {current_touch_event['y']}) duration={duration}ms (raw)")
+                # Handle both hex codes (0003) and text codes (ABS)
+                if event_kind == EV_ABS: # Absolute events like touch positions
+                    # getevent prints values as hex; only the codes acted on below are converted
+                    # Handle X position (0035 = ABS_MT_POSITION_X)
+                    abs_code = abs_code_of(event_code)
+                    if abs_code == ABS_MT_POSITION_X:
+                        event_value_int = int(event_value, 16)
+                        touch.x = event_value_int # Store raw value
+                        if debug:
+                            print(f"👆 TOUCH X (raw): {event_value_int}")
+
+                        # If finger is down and we don't have start coordinates yet, capture them
+                        if (touch.down and
+                            touch.start_x is None and
+                            touch.y is not None):
+                            touch.start_x = event_value_int
+                            touch.start_y = touch.y
+                            touch.start_time = now() * 1000
+                            if debug:
+                                print(f"🎯 SWIPE START CAPTURED: ({touch.start_x}, {touch.start_y}) at {touch.start_time}")
+
+                    # Handle Y position (0036 = ABS_MT_POSITION_Y)
+                    elif abs_code == ABS_MT_POSITION_Y:
+                        event_value_int = int(event_value, 16)
+                        touch.y = event_value_int # Store raw value
+                        if debug:
+                            print(f"👆 TOUCH Y (raw): {event_value_int}")
+
+                        # If finger is down and we don't have start coordinates yet, capture them
+                        if (touch.down and
+                            touch.start_y is None and
+                            touch.x is not None):
+                            touch.start_x = touch.x
+                            touch.start_y = event_value_int
+                            touch.start_time = now() * 1000
+                            if debug:
+                                print(f"🎯 SWIPE START CAPTURED: ({touch.start_x}, {touch.start_y}) at {touch.start_time}")
+                    # Handle tracking ID (0039 = ABS_MT_TRACKING_ID)
+                    elif abs_code == ABS_MT_TRACKING_ID:
+                        # ffffffff (4294967295) indicates finger UP (release)
+                        # Any other value indicates finger DOWN (press)
+                        if event_value == b'ffffffff': # Finger UP (release)
+                            if debug:
+                                print(f"👆 FINGER UP (RELEASE)")
+
+                            if touch.down and touch.x is not None and touch.y is not None:
+                                device_path = device_path.decode()
+                                end_time = now() * 1000  # Convert to milliseconds
+
+                                # Check if this is a swipe gesture
+                                if (touch.start_x is not None and
+                                    touch.start_y is not None and
+                                    touch.start_time is not None):
+
+                                    duration = end_time - touch.start_time
+
+                                    if debug:
+                                        # Calculate gesture metrics for debugging
+                                        distance = math.sqrt(calculate_distance_squared(
+                                            touch.start_x, touch.start_y,
+                                            touch.x, touch.y
+                                        ))
+                                        print(f"🔍 GESTURE ANALYSIS: distance={distance:.1f}px, duration={duration:.1f}ms")
+                                        print(f"🔍 SWIPE THRESHOLDS: min_distance={touch.swipe_threshold_distance}px, min_time={touch.swipe_threshold_time}ms")
+                                        print(f"🔍 LONG-TAP THRESHOLDS: min_time={touch.long_tap_threshold_time}ms, max_distance={touch.long_tap_threshold_distance}px")
+                                        print(f"🔍 START: ({touch.start_x}, {touch.start_y}) → END: ({touch.x}, {touch.y})")
+
+                                    # Check for different gesture types
+                                    is_swipe = is_swipe_gesture(
+                                        touch.start_x, touch.start_y,
+                                        touch.x, touch.y,
+                                        touch.start_time, end_time,
+                                        touch.swipe_threshold_distance,
+                                        touch.swipe_threshold_time
+                                    )
+
+                                    is_long_tap = is_long_tap_gesture(
+                                        touch.start_x, touch.start_y,
+                                        touch.x, touch.y,
+                                        touch.start_time, end_time,
+                                        touch.long_tap_threshold_time,
+                                        touch.long_tap_threshold_distance
+                                    )
+
+                                    if debug:
+                                        gesture_type = "SWIPE" if is_swipe else ("LONG-TAP" if is_long_tap else "TAP")
+                                        print(f"🔍 GESTURE DECISION: {gesture_type}")
+                                        print(f"🔍   - SWIPE: distance >= {touch.swipe_threshold_distance} ({distance >= touch.swipe_threshold_distance}) AND duration >= {touch.swipe_threshold_time} ({duration >= touch.swipe_threshold_time})")
+                                        print(f"🔍   - LONG-TAP: duration >= {touch.long_tap_threshold_time} ({duration >= touch.long_tap_threshold_time}) AND distance <= {touch.long_tap_threshold_distance} ({distance <= touch.long_tap_threshold_distance})")
+
+                                    if is_swipe:
+                                        # Send swipe event
+                                        duration = int(end_time - touch.start_time)
+                                        action_data = {
+                                            "action": "swipe",
+                                            "start_x": touch.start_x,
+                                            "start_y": touch.start_y,
+                                            "end_x": touch.x,
+                                            "end_y": touch.y,
+                                            "duration": duration,
+                                            "device_path": device_path
+                                        }
+                                        logger.debug("Preparing to send swipe: %s", action_data)
+                                        # Show clean action in normal mode, detailed in debug mode
+                                        if debug:
+                                            print(f"🚀 SENDING: swipe from ({touch.start_x}, {touch.start_y}) to ({touch.x}, {touch.y}) duration={duration}ms (raw)")
+                                        else:
+                                            print(f"👆 SWIPE COMPLETED")
+                                        await send_action(websocket, action_data)
+                                    elif is_long_tap:
+                                        # Send long-tap event
+                                        duration = int(end_time - touch.start_time)
+                                        action_data = {
+                                            "action": "long_tap",
+                                            "x": touch.x,
+                                            "y": touch.y,
+                                            "duration": duration,
+                                            "device_path": device_path
+                                        }
+                                        logger.debug("Preparing to send long_tap: %s", action_data)
+                                        # Show clean action in normal mode, detailed in debug mode
+                                        if debug:
+                                            print(f"🚀 SENDING: long_tap at ({touch.x}, {touch.y}) duration={duration}ms (raw)")
+                                        else:
+                                            print(f"🔒 LONG-TAP COMPLETED")
+                                        await send_action(websocket, action_data)
                                     else:
-                                        print(f"👆 SWIPE COMPLETED")
-                                    await send_action(websocket, action_data)
-                                elif is_long_tap:
-                                    # Send long-tap event
-                                    duration = int(end_time - current_touch_event["start_time"])
-                                    action_data = {
-                                        "action": "long_tap",
-                                        "x": current_touch_event["x"],
-                                        "y": current_touch_event["y"],
-                                        "duration": duration,
-                                        "device_path": device_path
-                                    }
-                                    logger.debug(f"Preparing to send long_tap: {action_data}")
-                                    # Show clean action in normal mode, detailed in debug mode
-                                    if args.debug:
-                                        print(f"🚀 SENDING: long_tap at ({current_touch_event['x']}, {current_touch_event['y']}) duration={duration}ms (raw)")
-                                    else:
-                                        print(f"🔒 LONG-TAP COMPLETED")
-                                    await send_action(websocket, action_data)
+                                        # Send one tap event at the press coordinates
+                                        action_data = {
+                                            "action": "tap",
+                                            "x": touch.start_x,
+                                            "y": touch.start_y,
+                                            "device_path": device_path
+                                        }
+                                        logger.debug("Preparing to send tap: %s", action_data)
+                                        # Show clean action in normal mode, detailed in debug mode
+                                        if debug:
+                                            print(f"🚀 SENDING: tap at ({touch.start_x}, {touch.start_y}) (raw)")
+                                        else:
+                                            print(f"🎯 TAP COMPLETED")
+                                        await send_action(websocket, action_data)
                                 else:
-                                    # Send tap_release event (existing tap logic)
+                                    # Fallback to a tap at the release coordinates if start coordinates not available
+                                    if debug:
+                                        print(f"⚠️  START COORDS MISSING - falling back to TAP: start_x={touch.start_x}, start_y={touch.start_y}, start_time={touch.start_time}")
+
                                     action_data = {
-                                        "action": "tap_release",
-                                        "x": current_touch_event["x"],
-                                        "y": current_touch_event["y"],
+                                        "action": "tap",
+                                        "x": touch.x,
+                                        "y": touch.y,
                                         "device_path": device_path
                                     }
-                                    logger.debug(f"Preparing to send tap_release: {action_data}")
-                                    # Show clean action in normal mode, detailed in debug mode
-                                    if args.debug:
-                                        print(f"🚀 SENDING: tap_release at ({current_touch_event['x']}, {current_touch_event['y']}) (raw)")
+                                    logger.debug("Preparing to send tap (fallback): %s", action_data)
+                                    if debug:
+                                        print(f"🚀 SENDING: tap at ({touch.x}, {touch.y}) (raw)")
                                     else:
                                         print(f"🎯 TAP COMPLETED")
                                     await send_action(websocket, action_data)
+
+                            # Reset touch event state
+                            touch.reset()
+
+                        else: # Finger DOWN (press)
+                            if debug:
+                                print(f"👆 FINGER DOWN (PRESS)")
+                            touch.down = True
+
+                            # Always try to capture start coordinates if available
+                            if touch.x is not None and touch.y is not None:
+                                # Store start coordinates and time for swipe detection
+                                touch.start_x = touch.x
+                                touch.start_y = touch.y
+                                touch.start_time = now() * 1000  # Convert to milliseconds
+
+                                # Nothing is sent on press; the gesture is classified and sent on release
+                                if debug:
+                                    print(f"🎯 FINGER DOWN - START COORDS SET: ({touch.start_x}, {touch.start_y}) at {touch.start_time}")
                             else:
-                                # Fallback to tap_release if start coordinates not available
-                                if args.debug:
-                                    print(f"⚠️  START COORDS MISSING - falling back to TAP: start_x={current_touch_event['start_x']}, start_y={current_touch_event['start_y']}, start_time={current_touch_event['start_time']}")
-
-                                action_data = {
-                                    "action": "tap_release",
-                                    "x": current_touch_event["x"],
-                                    "y": current_touch_event["y"],
-                                    "device_path": device_path
-                                }
-                                logger.debug(f"Preparing to send tap_release (fallback): {action_data}")
-                                if args.debug:
-                                    print(f"🚀 SENDING: tap_release at ({current_touch_event['x']}, {current_touch_event['y']}) (raw)")
-                                else:
-                                    print(f"🎯 TAP COMPLETED")
-                                await send_action(websocket, action_data)
-
-                        # Reset touch event state
-                        reset_touch_event()
-
-                    else: # Finger DOWN (press)
-                        if args.debug:
-                            print(f"👆 FINGER DOWN (PRESS)")
-                        current_touch_event["down"] = True
-
-                        # Always try to capture start coordinates if available
-                        if current_touch_event["x"] is not None and current_touch_event["y"] is not None:
-                            # Store start coordinates and time for swipe detection
-                            current_touch_event["start_x"] = current_touch_event["x"]
-                            current_touch_event["start_y"] = current_touch_event["y"]
-                            current_touch_event["start_time"] = time.time() * 1000  # Convert to milliseconds
-
-                            if args.debug:
-                                print(f"🎯 FINGER DOWN - START COORDS SET: ({current_touch_event['start_x']}, {current_touch_event['start_y']}) at {current_touch_event['start_time']}")
-
-                            # Send tap_press event (preserve existing tap logic)
-                            action_data = {
-                                "action": "tap_press",
-                                "x": current_touch_event["x"],
-                                "y": current_touch_event["y"],
-                                "device_path": device_path
-                            }
-                            logger.debug(f"Preparing to send tap_press: {action_data}")
-                            # Show clean action in normal mode, detailed in debug mode
-                            if args.debug:
-                                print(f"🚀 SENDING: tap_press at ({current_touch_event['x']}, {current_touch_event['y']}) (raw)")
-                            else:
-                                print(f"🎯 TAP STARTED")
-                            await send_action(websocket, action_data)
-                        else:
-                            if args.debug:
-                                print(f"🎯 FINGER DOWN - COORDS NOT YET AVAILABLE, will capture on next coordinate update")
- 
-            elif event_type == 'KEY' or event_type == '0001': # Key presses (for text input, back button etc.)
-                key_code = event_code
-                try:
-                    key_value = int(event_value, 16) if event_value.startswith('0') else int(event_value)
-                except ValueError:
-                    key_value = int(event_value)
+                                if debug:
+                                    print(f"🎯 FINGER DOWN - COORDS NOT YET AVAILABLE, will capture on next coordinate update")
  
-                if key_value == 1: # Key press down
-                    # Show clean action in normal mode, detailed in debug mode
-                    if args.debug:
-                        print(f"⌨️  KEY PRESS: {key_code}")
-                    else:
-                        print(f"⌨️  KEY: {key_code}")
-                    action_data = {"action": "key_press", "key_code": key_code, "device_path": device_path}
-                    logger.debug(f"Preparing to send key_press: {action_data}") # Log action data before sending
-                    await send_action(websocket, action_data)
-                elif key_value == 0: # Key release
-                    if args.debug:
-                        print(f"⌨️  KEY RELEASE: {key_code}")
-                    # Don't show key release in normal mode to avoid clutter
-                    action_data = {"action": "key_release", "key_code": key_code, "device_path": device_path}
-                    logger.debug(f"Preparing to send key_release: {action_data}") # Log action data before sending
-                    await send_action(websocket, action_data)
+                elif event_kind == EV_KEY: # Key presses (for text input, back button etc.)
+                    key_code = event_code.decode()
+                    device_path = device_path.decode()
+                    key_value = int(event_value, 16)
  
+                    if key_value == 1: # Key press down
+                        # Show clean action in normal mode, detailed in debug mode
+                        if debug:
+                            print(f"⌨️  KEY PRESS: {key_code}")
+                        else:
+                            print(f"⌨️  KEY: {key_code}")
+                        action_data = {"action": "key_press", "key_code": key_code, "device_path": device_path}
+                        logger.debug("Preparing to send key_press: %s", action_data) # Log action data before sending
+                        await send_action(websocket, action_data)
+                    elif key_value == 0: # Key release
+                        if debug:
+                            print(f"⌨️  KEY RELEASE: {key_code}")
+                        # Don't show key release in normal mode to avoid clutter
+                        action_data = {"action": "key_release", "key_code": key_code, "device_path": device_path}
+                        logger.debug("Preparing to send key_release: %s", action_data) # Log action data before sending
+                        await send_action(websocket, action_data)
+
         await process.wait() # Wait for the subprocess to finish if it somehow terminates
+        await stderr_task # Its stderr is closed now too, so anything left has been logged
     except Exception as e:
         logger.error(f"Error in monitor_adb_events: {e}")
         return
+    finally:
+        # On errors or cancellation, don't leave getevent or its stderr reader running
+        if stderr_task is not None:
+            stderr_task.cancel()
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        await shell.close()
  
 async def main():
     # Prompt user to select master device
@@ -705,20 +832,36 @@ async def main():
     print(f"\n🚀 Starting Master Recorder for device: {master_device_id}")
     print("="*60)
     
+    delay = RECONNECT_DELAY_MIN
     while True: # Keep trying to connect/monitor if connection drops or adb process dies
+        started = time.monotonic()
+        websocket = None
         try:
             websocket = await connect_websocket()
             if websocket:
                 await monitor_adb_events(websocket, master_device_id)
             else:
-                logger.error("Could not establish initial WebSocket connection. Retrying...")
+                logger.error("Could not establish WebSocket connection.")
         except Exception as e:
             logger.error(f"Error in main loop: {e}")
-        await asyncio.sleep(5) # Wait before retrying the entire connection/monitor loop
+        finally:
+            # Each attempt opens a fresh connection; don't leave the previous one open
+            if websocket is not None:
+                await websocket.close()
+        # A session that stayed up a while was a success; only quick failures in a row back off further
+        if time.monotonic() - started >= RECONNECT_DELAY_MAX:
+            delay = RECONNECT_DELAY_MIN
+        wait = reconnect_delay(delay)
+        logger.info(f"Retrying in {wait:.1f} seconds...")
+        await asyncio.sleep(wait) # Wait before retrying the entire connection/monitor loop
+        delay = min(delay * 2, RECONNECT_DELAY_MAX)
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if UVLOOP_AVAILABLE:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Master Recorder stopped by user (Ctrl+C)")
     except Exception as e:
@@ -0,0 +1,11 @@
+"""Frame format and per-device backpressure shared by the central servers"""
+from typing import List
+
+FARM_QUEUE_SIZE = 64 # Pending frames kept per farm device; the oldest is dropped when full
+BATCH_PREFIX = b'{"action":"batch","items":['
+BATCH_SEPARATOR = b','
+BATCH_SUFFIX = b']}'
+
+def batch_frame(payloads: List[bytes]) -> bytes:
+    """Merge encoded actions into one "batch" frame; they're already JSON, so they're spliced in without re-parsing"""
+    return BATCH_PREFIX + BATCH_SEPARATOR.join(payloads) + BATCH_SUFFIX
@@ -7,19 +7,21 @@ This script simulates the swipe detection logic to help debug threshold issues
 import math
 import time
 
-def calculate_distance(x1, y1, x2, y2):
-    """Calculate distance between two points"""
-    return math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+def calculate_distance_squared(x1, y1, x2, y2):
+    """Squared distance between two points, for threshold checks without a sqrt"""
+    dx = x2 - x1
+    dy = y2 - y1
+    return dx * dx + dy * dy
 
 def is_swipe_gesture(start_x, start_y, end_x, end_y, start_time, end_time, threshold_distance, threshold_time):
     """Determine if movement qualifies as a swipe gesture"""
     if start_x is None or start_y is None or end_x is None or end_y is None:
         return False
     
-    distance = calculate_distance(start_x, start_y, end_x, end_y)
+    distance_squared = calculate_distance_squared(start_x, start_y, end_x, end_y)
     duration = end_time - start_time
     
-    return distance >= threshold_distance and duration >= threshold_time
+    return distance_squared >= threshold_distance * threshold_distance and duration >= threshold_time
 
 def test_swipe_scenarios():
     """Test various swipe scenarios"""
@@ -41,6 +43,7 @@ def test_swipe_scenarios():
     # Current thresholds
     threshold_distance = 200  # Updated threshold
     threshold_time = 50       # Updated threshold
+    threshold_distance_squared = threshold_distance * threshold_distance
     
     print(f"Thresholds: distance >= {threshold_distance}, time >= {threshold_time}ms")
     print()
@@ -49,16 +52,16 @@ def test_swipe_scenarios():
         start_time = 1000.0  # Mock start time
         end_time = start_time + duration
         
-        distance = calculate_distance(start_x, start_y, end_x, end_y)
+        distance_squared = calculate_distance_squared(start_x, start_y, end_x, end_y)
         is_swipe = is_swipe_gesture(start_x, start_y, end_x, end_y, start_time, end_time, threshold_distance, threshold_time)
         
         result = "SWIPE" if is_swipe else "TAP"
-        distance_check = "✅" if distance >= threshold_distance else "❌"
+        distance_check = "✅" if distance_squared >= threshold_distance_squared else "❌"
         time_check = "✅" if duration >= threshold_time else "❌"
         
         print(f"Test {i}: {description}")
         print(f"  Coordinates: ({start_x}, {start_y}) → ({end_x}, {end_y})")
-        print(f"  Distance: {distance:.1f} {distance_check} (>= {threshold_distance})")
+        print(f"  Distance: {math.sqrt(distance_squared):.1f} {distance_check} (>= {threshold_distance})")
         print(f"  Duration: {duration}ms {time_check} (>= {threshold_time}ms)")
         print(f"  Result: {result}")
         print()